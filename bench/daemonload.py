@@ -0,0 +1,125 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/daemonload.py
+# Purpose: Load test of the signature daemon with many concurrent clients
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Starts a daemon (or uses the one on --socket), connects 'clients'
+    client processes at once, each sending requests over its own
+    connection for 'seconds', and prints requests per second and latency
+    percentiles.
+    Usage: python bench/daemonload.py [--clients 64] [--seconds 5]
+        [--command text|json] [--socket PATH]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import argparse
+import subprocess
+import multiprocessing
+
+topdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, topdir)
+import signaturedaemon
+
+
+def client(path, command, start, seconds, results):
+    # One connection, requests until the end time, latencies in seconds
+    latencies = list()
+    s = signaturedaemon.connect(path, timeout=30)
+    f = s.makefile("rwb")
+    line = command.encode("ascii") + b"\n"
+    while time.time() < start:
+        time.sleep(0.001)
+    end = start + seconds
+    while True:
+        t = time.time()
+        if t >= end:
+            break
+        f.write(line)
+        f.flush()
+        if signaturedaemon.readframe(f) is None:
+            break
+        latencies.append(time.time() - t)
+    s.close()
+    results.put(latencies)
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p / 100.0))]
+
+def startdaemon(path, cwd):
+    p = subprocess.Popen([sys.executable, os.path.join(topdir, "forum_signature_gtk3.py"),
+        "--daemon", path], cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    for i in range(100):
+        try:
+            signaturedaemon.query(path, "ping", timeout=1)
+            return p
+        except (IOError, OSError):
+            time.sleep(0.1)
+    p.kill()
+    raise RuntimeError("The daemon did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description='Signature daemon load test')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--command', default="text", choices=("text", "json"))
+    parser.add_argument('--socket', help='Socket of a running daemon')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    daemon = None
+    path = args.socket
+    try:
+        if not path:
+            path = os.path.join(tmp, "forum-signature.sock")
+            daemon = startdaemon(path, tmp)
+        results = multiprocessing.Queue()
+        start = time.time() + 0.5 + args.clients * 0.01 # All clients connected
+        procs = [multiprocessing.Process(target=client,
+            args=(path, args.command, start, args.seconds, results))
+            for i in range(args.clients)]
+        for p in procs:
+            p.start()
+        latencies = list()
+        for p in procs:
+            latencies.extend(results.get())
+        for p in procs:
+            p.join()
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait()
+        shutil.rmtree(tmp)
+
+    latencies.sort()
+    if not latencies:
+        print("No answers")
+        return 1
+    print("{0} clients, {1} requests in {2:.1f}s: {3:.0f} requests/s".format(
+        args.clients, len(latencies), args.seconds, len(latencies) / args.seconds))
+    print("latency p50 {0:.2f}ms, p90 {1:.2f}ms, p99 {2:.2f}ms, max {3:.2f}ms".format(
+        percentile(latencies, 50) * 1e3, percentile(latencies, 90) * 1e3,
+        percentile(latencies, 99) * 1e3, latencies[-1] * 1e3))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/dicreplace.py
+# Purpose: Micro-benchmark of core.dicreplace() against dictionary size
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Compares the old loop of str.replace() calls with vendornormalizer,
+    for synthetic vendor dictionaries of 50 to 50,000 entries.
+    Usage: python bench/dicreplace.py [repeats]
+"""
+
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from vendornormalizer import vendornormalizer
+
+text = """1 Γνώσεις Linux: � ┃ Προγραμματισμού: � ┃ Αγγλικών: �
+2 Ubuntu 12.04 precise 3.2.0-29-generic 64bit (el_GR.UTF-8, Unity ubuntu), Windows 7
+3 Intel(R) Core(TM)2 Duo CPU     E6550  @ 2.33GHz ‖ RAM 3961 MiB ‖ MICRO-STAR INTERNATIONAL CO.,LTD MS-7235
+4 01:00.0 VGA compatible controller [0300]: NVIDIA Corporation G73 [GeForce 7300 GT] [10de:0393] {nouveau}
+5 eth0: 04:00.0 Ethernet controller [0200]: Realtek Semiconductor Co., Ltd. RTL8111/8168B PCI Express Gigabit Ethernet controller [10ec:8168] (rev 03) ⋮ wlan0: Bus 002 Device 004: ID 0cf3:1002 Atheros Communications, Inc. TP-Link TL-WN821N v2
+"""
+
+base = {
+    "MICRO-STAR INTERNATIONAL CO.,LTD": "MSI",
+    "Atheros Communications, Inc.": "Atheros",
+    "Atheros Communications": "Atheros",
+    "Realtek Semiconductor Co., Ltd.": "Realtek",
+    "NVIDIA Corporation": "nVidia",
+    "(R)": "",
+    "(TM)": "",
+}
+
+def makedic(size):
+    # Synthetic vendor names, similar in shape to pci.ids vendors
+    r = random.Random(size)
+    words = ["Technology", "Semiconductor", "Corporation", "Co., Ltd.",
+        "Inc.", "Electronics", "Systems", "Communications", "Labs", "GmbH"]
+    dic = dict(base)
+    while len(dic) < size:
+        name = "".join(r.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for i in range(r.randint(3, 9)))
+        key = "{0} {1} {2}".format(name, r.choice(words), r.choice(words))
+        dic[key] = name
+    return dic
+
+def oldreplace(dic, s):
+    for key,val in list(dic.items()):
+        s = s.replace(key, val)
+    return s
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("{0:>8} {1:>14} {2:>14} {3:>12}".format(
+        "entries", "str.replace", "normalizer", "compile"))
+    for size in (50, 500, 5000, 50000):
+        dic = makedic(size)
+        t0 = timeit.default_timer()
+        n = vendornormalizer(dic)
+        compiletime = timeit.default_timer() - t0
+        old = min(timeit.repeat(lambda: oldreplace(dic, text), number=1, repeat=repeats))
+        new = min(timeit.repeat(lambda: n.replace(text), number=1, repeat=repeats))
+        print("{0:>8} {1:>12.1f}us {2:>12.1f}us {3:>10.1f}ms".format(
+            size, old * 1e6, new * 1e6, compiletime * 1e3))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/fixtures/makefixtures.py
+# Purpose: Builds the snapshot fixtures of the benchmarks
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" desktop.fss: the machine of the example signature (Core2 Duo, MSI
+    board, nVidia VGA, Realtek ethernet, Atheros USB wifi), Ubuntu with 10
+    kernels and Windows 7 in grub.cfg. The capture directory is written to
+    a temporary directory and recorded with snapshot.capture().
+    Usage: python bench/fixtures/makefixtures.py
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+fixturedir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(fixturedir, "..", ".."))
+sys.path.insert(0, os.path.join(fixturedir, ".."))
+import snapshot
+import sysroot
+from grubparse import makeconfig
+
+cpuinfo = """processor	: {0}
+vendor_id	: GenuineIntel
+cpu family	: 6
+model		: 15
+model name	: Intel(R) Core(TM)2 Duo CPU     E6550  @ 2.33GHz
+stepping	: 11
+cpu MHz		: 2333.000
+cache size	: 4096 KB
+physical id	: 0
+siblings	: 2
+core id		: {0}
+cpu cores	: 2
+flags		: fpu vme de pse tsc msr pae mce cx8 apic sep mtrr pge mca cmov pat pse36 clflush dts acpi mmx fxsr sse sse2 ss ht tm pbe syscall nx lm constant_tsc arch_perfmon pebs bts rep_good nopl aperfmperf pni dtes64 monitor ds_cpl vmx est tm2 ssse3 cx16 xtpr pdcm lahf_lm dtherm tpr_shadow
+bogomips	: 4666.{0}1
+
+"""
+
+meminfo = """MemTotal:        4056264 kB
+MemFree:         1523684 kB
+Buffers:          211084 kB
+Cached:          1265524 kB
+SwapCached:            0 kB
+Active:          1368968 kB
+Inactive:         912460 kB
+SwapTotal:       4194300 kB
+SwapFree:        4194300 kB
+"""
+
+pcidevices = [
+    # slot, uevent, revision
+    ("0000:00:00.0", "PCI_CLASS=60000\nPCI_ID=8086:29C0\nPCI_SUBSYS_ID=1462:7235\n", "0x02"),
+    ("0000:01:00.0", "DRIVER=nouveau\nPCI_CLASS=30000\nPCI_ID=10DE:0393\nPCI_SUBSYS_ID=1462:0C45\n", "0xa1"),
+    ("0000:04:00.0", "DRIVER=r8169\nPCI_CLASS=20000\nPCI_ID=10EC:8168\nPCI_SUBSYS_ID=1462:7235\n", "0x03"),
+]
+
+usbdevices = {
+    # name: attributes
+    "usb2": {"idVendor": "1d6b", "idProduct": "0002", "busnum": "2", "devnum": "1",
+        "bDeviceClass": "09", "bcdDevice": "0302", "manufacturer": "Linux 3.2.0-29-generic ehci_hcd",
+        "product": "EHCI Host Controller"},
+    "2-1": {"idVendor": "0cf3", "idProduct": "1002", "busnum": "2", "devnum": "4",
+        "bDeviceClass": "ff", "bcdDevice": "0108", "manufacturer": "ATHEROS",
+        "product": "USB2.0 WLAN"},
+}
+
+pcinames = {
+    "8086": "Intel Corporation",
+    "8086:29c0": "82G33/G31/P35/P31 Express DRAM Controller",
+    "10de": "NVIDIA Corporation",
+    "10de:0393": "G73 [GeForce 7300 GT]",
+    "10ec": "Realtek Semiconductor Co., Ltd.",
+    "10ec:8168": "RTL8111/8168/8411 PCI Express Gigabit Ethernet Controller",
+    "C 02": "Network controller",
+    "C 0200": "Ethernet controller",
+    "C 03": "Display controller",
+    "C 0300": "VGA compatible controller",
+    "C 06": "Bridge",
+    "C 0600": "Host bridge",
+}
+
+usbnames = {
+    "1d6b": "Linux Foundation",
+    "1d6b:0002": "2.0 root hub",
+    "0cf3": "Atheros Communications, Inc.",
+    "0cf3:1002": "TP-Link TL-WN821N v2 / TL-WN822N v1 802.11n [Atheros AR9170]",
+}
+
+dmi = {
+    "board_vendor": "MICRO-STAR INTERNATIONAL CO.,LTD",
+    "board_name": "MS-7235",
+    "sys_vendor": "MICRO-STAR INTERNATIONAL CO.,LTD",
+    "product_name": "MS-7235",
+}
+
+
+def makedesktop(d):
+    def write(path, text):
+        p = os.path.join(d, path.lstrip("/"))
+        if not os.path.isdir(os.path.dirname(p)):
+            os.makedirs(os.path.dirname(p))
+        with open(p, "w") as f:
+            f.write(text)
+    def link(path, target):
+        p = os.path.join(d, path.lstrip("/"))
+        if not os.path.isdir(os.path.dirname(p)):
+            os.makedirs(os.path.dirname(p))
+        os.symlink(target, p)
+
+    write("/proc/cpuinfo", "".join(cpuinfo.format(i) for i in range(2)))
+    write("/proc/meminfo", meminfo)
+    write("/sys/devices/system/cpu/online", "0-1\n")
+    for i in range(2):
+        topology = "/sys/devices/system/cpu/cpu{0}/topology/".format(i)
+        write(topology + "core_cpus", "{0:x}\n".format(1 << i))
+        write(topology + "package_cpus", "3\n")
+    for (name, value) in dmi.items():
+        write("/sys/devices/virtual/dmi/id/" + name, value + "\n")
+    for (slot, uevent, revision) in pcidevices:
+        device = "/sys/devices/pci0000:00/" + slot
+        write(device + "/uevent", uevent)
+        write(device + "/revision", revision + "\n")
+        link("/sys/bus/pci/devices/" + slot, "../../../devices/pci0000:00/" + slot)
+    for (name, attributes) in usbdevices.items():
+        device = "/sys/devices/pci0000:00/0000:00:1d.7/" + name
+        for (key, value) in attributes.items():
+            write(device + "/" + key, value + "\n")
+        link(device + "/driver", "../../../../bus/usb/drivers/usb")
+        link("/sys/bus/usb/devices/" + name, "../../../devices/pci0000:00/0000:00:1d.7/" + name)
+    wifi = "/sys/devices/pci0000:00/0000:00:1d.7/2-1/2-1:1.0"
+    write(wifi + "/modalias", "usb:v0CF3p1002d0108dc00dsc00dp00icFFiscFFipFFin00\n")
+    link(wifi + "/net/wlan0/device", "../../../2-1:1.0")
+    link("/sys/class/net/wlan0", "../../devices/pci0000:00/0000:00:1d.7/2-1/2-1:1.0/net/wlan0")
+    link("/sys/devices/pci0000:00/0000:04:00.0/net/eth0/device", "../../../0000:04:00.0")
+    link("/sys/class/net/eth0", "../../devices/pci0000:00/0000:04:00.0/net/eth0")
+    write("/sys/devices/virtual/net/lo/uevent", "INTERFACE=lo\n")
+    link("/sys/class/net/lo", "../../devices/virtual/net/lo")
+    write("/sys/devices/system/node/online", "0\n")
+    write("/boot/grub/grub.cfg", makeconfig(10))
+    write("/etc/fstab", "UUID=9d1c / ext4 errors=remount-ro 0 1\n"
+        "UUID=77ab none swap sw 0 0\n")
+    write("/etc/os-release", 'NAME="Ubuntu"\nVERSION="12.04.1 LTS, Precise Pangolin"\n'
+        'ID=ubuntu\nVERSION_ID="12.04"\nVERSION_CODENAME=precise\n')
+    meta = sysroot.metadir
+    write(meta + "/environ", "LANG=el_GR.UTF-8\nXDG_CURRENT_DESKTOP=Unity\nDESKTOP_SESSION=ubuntu\n")
+    write(meta + "/uname", "Linux\n\n3.2.0-10-generic\n#46-Ubuntu SMP\nx86_64\n")
+    write(meta + "/pci.names", "".join("{0}\t{1}\n".format(k, v) for (k, v) in sorted(pcinames.items())))
+    write(meta + "/usb.names", "".join("{0}\t{1}\n".format(k, v) for (k, v) in sorted(usbnames.items())))
+
+def main():
+    tmp = tempfile.mkdtemp()
+    try:
+        makedesktop(tmp)
+        filename = os.path.join(fixturedir, "desktop.fss")
+        (s, size) = snapshot.capture(filename, inner=sysroot.directoryroot(tmp))
+        print("{0}: {1} bytes".format(filename, size))
+        print("{0}\n{1}\n{2}".format(s.knowledge, s.osinfo, s.specs))
+    finally:
+        shutil.rmtree(tmp)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/fleet.py
+# Purpose: Throughput of fleet mode for 1 to N worker processes
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Probes the given capture roots 'copies' times each, with 1, 2, 4, ...
+    up to the number of cpus worker processes, and prints roots per second
+    and the speedup over one process (linear scaling: speedup = processes).
+    Usage: python bench/fleet.py ROOT... [--copies 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import fleet
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fleet mode scaling')
+    parser.add_argument('roots', nargs='+', metavar='ROOT')
+    parser.add_argument('--copies', type=int, default=500)
+    parser.add_argument('--chunk-size', type=int, default=8)
+    args = parser.parse_args()
+
+    cpus = multiprocessing.cpu_count()
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    print("{0:>9} {1:>10} {2:>8}".format("processes", "roots/s", "speedup"))
+    base = None
+    for n in counts:
+        f = fleet.fleet(processes=n, chunksize=args.chunk_size)
+        roots = (r for i in range(args.copies) for r in args.roots)
+        t = time.time()
+        for line in f.run(roots):
+            pass
+        rate = f.done / (time.time() - t)
+        if f.failed:
+            print("{0} roots failed".format(f.failed))
+            return 1
+        base = base or rate
+        print("{0:>9} {1:>10.0f} {2:>7.2f}x".format(n, rate, rate / base))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/grubchecks.py
+# Purpose: Per-entry cost of grubrules against the old osgrubber checks
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Runs the blacklist, version, title and current kernel checks of
+    read_grub() on the entries of the synthetic configs of bench/grubparse.py.
+    Usage: python bench/grubchecks.py [repeats]
+"""
+
+import os
+import sys
+import re
+import platform
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import grubparser
+from grubrules import grubrules
+from grubparse import makeconfig
+
+def oldchecks(entries):
+    # read_grub(), truncate_titles() and is_currentos() before grubrules
+    result = list()
+    for e in entries:
+        l = e['linuxstr']
+        t = e['title']
+        if not l == None and (t == "Ubuntu" or "Fallback" in t or "ανάκτηση" in t or "fallback" in l or "recovery" in l or "memtest" in l):
+            continue
+        if "Recovery" in t:
+            continue
+        v = ""
+        if not l == None:
+            mre = re.match(".*vmlinuz-([^\s]*)", l)
+            if mre:
+                v = mre.group(1)
+        s = re.sub(',? [^\s]*? Linux.*', '', t)
+        s = re.sub('\([^\)]*?\)$|\s*?\(loader\)', '', s)
+        s = re.sub('\s+', ' ', s).rstrip()
+        ltv = " ".join([s, v]).rstrip()
+        un = platform.uname()
+        current = un[0] == "Linux" and re.search(un[2].replace('.', '\.'), ltv)
+        result.append((ltv, bool(current)))
+    return result
+
+def newchecks(entries):
+    rules = grubrules()
+    result = list()
+    for e in entries:
+        l = e['linuxstr']
+        t = e['title']
+        if rules.blacklisted(t, l):
+            continue
+        ltv = " ".join([rules.title(t), rules.version(l)]).rstrip()
+        result.append((ltv, rules.iscurrent(ltv)))
+    return result
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print("{0:>8} {1:>8} {2:>14} {3:>14}".format(
+        "kernels", "entries", "old/entry", "grubrules/entry"))
+    for kernels in (10, 100, 1000, 5000):
+        entries = list(grubparser.parseentries(makeconfig(kernels).splitlines()))
+        assert oldchecks(entries) == newchecks(entries)
+        old = min(timeit.repeat(lambda: oldchecks(entries), number=1, repeat=repeats))
+        new = min(timeit.repeat(lambda: newchecks(entries), number=1, repeat=repeats))
+        print("{0:>8} {1:>8} {2:>12.2f}us {3:>12.2f}us".format(
+            kernels, len(entries), old / len(entries) * 1e6, new / len(entries) * 1e6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/grubparse.py
+# Purpose: Benchmark of grubparser against the old osgrubber.read_grub() regex
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Times both parsers on synthetic Ubuntu-style grub.cfg files with a
+    growing number of kernels (each with a recovery entry, in a submenu).
+    The second table uses entries without "set root" (e.g. EFI installs that
+    only use "search --set=root"), where every regex match attempt scans to
+    the end of the file.
+    Usage: python bench/grubparse.py [repeats]
+"""
+
+import os
+import sys
+import re
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import grubparser
+
+# The regular expression of read_grub() before grubparser
+oldregex = "menuentry ['\"](?P<title>.*?)['\"].*?set root='\(?(?P<device>.*?)\)?'(?:.*?(?:chainloader.*?\n|(?:linux16|linux)\s(?P<linuxstr>.*?)\n)|.*?)"
+
+header = """#
+# DO NOT EDIT THIS FILE
+#
+if [ -s $prefix/grubenv ]; then
+  set have_grubenv=true
+  load_env
+fi
+function savedefault {
+  if [ -z "${boot_once}" ]; then
+    saved_entry="${chosen}"
+    save_env saved_entry
+  fi
+}
+function load_video {
+  insmod vbe
+  insmod vga
+}
+"""
+
+entry = """menuentry '{title}' --class ubuntu --class gnu-linux --class os {{
+	recordfail
+	load_video
+	insmod ext2
+	set root='hd0,msdos{part}'
+	if [ x$feature_platform_search_hint = xy ]; then
+	  search --no-floppy --fs-uuid --set=root --hint-bios=hd0,msdos{part} 9d1c
+	else
+	  search --no-floppy --fs-uuid --set=root 9d1c
+	fi
+	echo	'Loading Linux {version} ...'
+	linux	/boot/vmlinuz-{version} root=UUID=9d1c ro {args}
+	echo	'Loading initial ramdisk ...'
+	initrd	/boot/initrd.img-{version}
+}}
+"""
+
+windows = """menuentry 'Windows 7 (loader) (on /dev/sda1)' --class windows --class os {
+	insmod ntfs
+	set root='hd0,msdos1'
+	chainloader +1
+}
+"""
+
+# Not an OS: skipped by read_grub()
+fwsetup = """menuentry 'UEFI Firmware Settings' $menuentry_id_option 'uefi-firmware' {
+	fwsetup
+}
+"""
+
+# os-prober entries of other systems: (entry, expected loader, expected linuxstr)
+othersystems = [
+    ("""menuentry "FreeBSD 9.0-RELEASE (on /dev/sda3)" --class freebsd --class bsd --class os {
+	insmod ufs2
+	set root='(hd0,msdos3)'
+	kfreebsd /boot/kernel/kernel
+	kfreebsd_loadenv /boot/device.hints
+	set kFreeBSD.vfs.root.mountfrom=ufs:/dev/ada0s3a
+}
+""", "kfreebsd", None),
+    ("""menuentry "NetBSD 6.0 (on /dev/sda4)" --class netbsd --class bsd --class os {
+	set root='(hd0,msdos4)'
+	knetbsd /netbsd
+}
+""", "knetbsd", None),
+    ("""menuentry "OpenBSD 5.2 (on /dev/sda5)" --class openbsd --class bsd --class os {
+	set root='(hd0,msdos5)'
+	kopenbsd /bsd
+}
+""", "kopenbsd", None),
+    ("""menuentry "Mac OS X (64-bit) (on /dev/sda2)" --class osx --class darwin --class os {
+	insmod hfsplus
+	set root='(hd0,gpt2)'
+	set do_resume=0
+	if [ /var/vm/sleepimage -nt10 / ]; then
+	   if xnu_resume /var/vm/sleepimage; then
+	     set do_resume=1
+	   fi
+	fi
+	if [ $do_resume = 0 ]; then
+	   xnu_uuid 4a1b uuid
+	   xnu_kernel64 /mach_kernel boot-uuid=${uuid} rd=*uuid
+	fi
+}
+""", "xnu_kernel64", None),
+    ("""menuentry "Mac OS X (32-bit) (on /dev/sda2)" --class osx --class darwin --class os {
+	set root='(hd0,gpt2)'
+	xnu_kernel /mach_kernel boot-uuid=${uuid} rd=*uuid
+}
+""", "xnu_kernel", None),
+    ("""menuentry "Windows Vista (on /dev/sda3)" --class windows --class os {
+	set root='(hd0,gpt3)'
+	appleloader /dev/sda3
+}
+""", "appleloader", None),
+    ("""menuentry 'Ubuntu GNU/Linux, with Xen hypervisor' --class ubuntu --class xen {
+	set root='(hd0,msdos1)'
+	multiboot	/boot/xen-4.1-amd64.gz placeholder
+	module	/boot/vmlinuz-3.2.0-29-generic placeholder root=UUID=9d1c ro quiet
+	module	--nounzip   /boot/initrd.img-3.2.0-29-generic
+}
+""", "multiboot", "/boot/vmlinuz-3.2.0-29-generic placeholder root=UUID=9d1c ro quiet"),
+    ("""menuentry 'Debian GNU/Linux, with Xen 4.17' --class debian --class xen {
+	set root='(hd0,gpt2)'
+	xen_hypervisor	/boot/xen-4.17-amd64.gz placeholder
+	xen_module	/boot/vmlinuz-6.1.0-13-amd64 placeholder root=UUID=77ab ro
+}
+""", "xen_hypervisor", "/boot/vmlinuz-6.1.0-13-amd64 placeholder root=UUID=77ab ro"),
+    ("""menuentry 'Xen multiboot2' {
+	set root='(hd0,gpt2)'
+	multiboot2	/boot/xen.efi
+	module2	/boot/vmlinuz-6.1.0-13-amd64 root=UUID=77ab ro
+}
+""", "multiboot2", "/boot/vmlinuz-6.1.0-13-amd64 root=UUID=77ab ro"),
+    ("""menuentry 'Old kernel (grub legacy style)' {
+	set root='(hd0,msdos1)'
+	kernel /boot/memdisk
+}
+""", "kernel", None),
+]
+
+def checkentries():
+    """ Every entry kind is parsed as bootable, fwsetup is not """
+    for (text, loader, linuxstr) in othersystems:
+        (e,) = grubparser.parseentries(text.splitlines())
+        assert grubparser.bootable(e) and e["loader"] == loader and e["linuxstr"] == linuxstr, e
+    (e,) = grubparser.parseentries(fwsetup.splitlines())
+    assert not grubparser.bootable(e), e
+    (e,) = grubparser.parseentries(windows.splitlines())
+    assert grubparser.bootable(e) and e["chainloader"] and e["device"] == "hd0,msdos1", e
+    print("{0} entry kinds parsed".format(len(othersystems) + 2))
+
+def makeconfig(kernels, setroot=True):
+    parts = [header, entry.format(title="Ubuntu", part=5,
+        version="3.2.0-{0}-generic".format(kernels), args="quiet splash")]
+    parts.append("submenu 'Advanced options for Ubuntu' {\n")
+    for i in range(kernels, 0, -1):
+        v = "3.2.0-{0}-generic".format(i)
+        parts.append(entry.format(title="Ubuntu, with Linux " + v, part=5,
+            version=v, args="quiet splash"))
+        parts.append(entry.format(title="Ubuntu, with Linux {0} (recovery mode)".format(v),
+            part=5, version=v, args="recovery nomodeset"))
+    parts.append("}\n")
+    parts.append(windows)
+    parts.append(fwsetup)
+    text = "".join(parts)
+    if not setroot:
+        text = re.sub("\tset root='.*?'\n", "", text)
+    return text
+
+def oldparse(text):
+    return [m.groupdict() for m in re.finditer(oldregex, text, re.S)]
+
+def newparse(text):
+    # Entries read_grub() keeps (fwsetup is dropped)
+    return [e for e in grubparser.parseentries(text.splitlines()) if grubparser.bootable(e)]
+
+def table(title, sizes, setroot, repeats):
+    print(title)
+    print("{0:>8} {1:>10} {2:>12} {3:>12} {4:>8}".format(
+        "kernels", "size", "regex", "grubparser", "entries (regex/new)"))
+    for kernels in sizes:
+        text = makeconfig(kernels, setroot)
+        titles = [e["title"] for e in newparse(text)]
+        assert not "UEFI Firmware Settings" in titles, "fwsetup entry counted as an OS"
+        old = min(timeit.repeat(lambda: oldparse(text), number=1, repeat=repeats))
+        new = min(timeit.repeat(lambda: newparse(text), number=1, repeat=repeats))
+        print("{0:>8} {1:>8}KB {2:>10.2f}ms {3:>10.2f}ms {4:>5}/{5:<5}".format(
+            kernels, len(text) // 1024, old * 1e3, new * 1e3,
+            len(oldparse(text)), len(newparse(text))))
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    checkentries()
+    table("Entries with set root", (10, 100, 500, 2000), True, repeats)
+    table("Entries without set root", (5, 10, 20, 40), False, repeats)
+
+if __name__ == "__main__":
+    main()
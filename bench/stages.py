@@ -0,0 +1,243 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/stages.py
+# Purpose: Times every stage of a signature run on fixture inputs, against stored baselines
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The stages run on bench/fixtures/desktop.fss (see makefixtures.py),
+    so their inputs are the same everywhere, except cold and warm:
+        grub        osgrubber: grub.cfg parsing, rules, os facts, fstab
+        dicreplace  vendor abbreviations on the unreplaced signature text
+        display     lspci, driver and display probes on a new core
+        network     lspci, lsusb and network probes on a new core
+        cpu         cpu model and topology
+        memory      /proc/meminfo
+        render      collect() and render(), all probes on the scheduler
+        process     a new process (-t --root fixture), captures are never cached
+        cold        collect() on this system with an empty probe cache
+        warm        the same with the probe cache of a previous collect()
+    The probe cache is only used for the live system, so cold and warm
+    probe this machine (baselines are machine specific anyway). They run
+    in this process: a new process spends most of its time on imports
+    and the log, the same with and without the cache (see process). A run
+    where warm is not faster than cold fails.
+    Every stage is run in rounds; a round calls it enough times to last
+    ~20ms. The median, standard deviation (% of the median) and minimum of
+    the time per call are printed and compared with the medians of
+    bench/baselines.json. A stage slower than its baseline by more than
+    the threshold, and by more than 2µs (the timer and scheduler noise of
+    the stages of a few µs), fails the run (exit status 1).
+
+    Usage: python bench/stages.py [--rounds 15] [--stage grub ...]
+        [--threshold 0.3] [--save]
+    --save stores the medians of this run as the new baselines. Baselines
+    are machine specific: save them again on the machine that compares.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+
+benchdir = os.path.dirname(os.path.abspath(__file__))
+topdir = os.path.join(benchdir, "..")
+sys.path.insert(0, topdir)
+from forum_signature_gtk3 import core, osgrubber, collect, render
+from probescheduler import probescheduler
+from probecache import probecache
+import sysroot
+
+fixturefile = os.path.join(benchdir, "fixtures", "desktop.fss")
+baselinefile = os.path.join(benchdir, "baselines.json")
+timer = getattr(time, "perf_counter", time.time)
+log = logging.getLogger("forum-signature.bench")
+log.addHandler(logging.NullHandler())
+
+
+def newcore(root):
+    # A core whose probes were added to a scheduler that never runs
+    return core(None, logger=log, scheduler=probescheduler(logger=log), root=root)
+
+def unreplacedtext(root):
+    # Signature text before dicreplace()
+    scheduler = probescheduler(logger=log, workers=1)
+    c = core(None, logger=log, scheduler=scheduler, root=root)
+    scheduler.run()
+    c.osgrubbertuple = osgrubber(logger=log, root=root).returnall()
+    return "{0}\n{1}\n{2}".format(c.knowledge(), c.osinfo(), c.specs())
+
+minchange = 2e-6 # Smaller slowdowns are noise, whatever their percentage
+
+def runprocess(cachedir):
+    env = dict(os.environ, XDG_CACHE_HOME=cachedir)
+    logfile = os.path.join(cachedir, "bench.log")
+    with open(os.devnull, "w") as null:
+        subprocess.check_call([sys.executable, os.path.join(topdir, "forum_signature_gtk3.py"),
+            "-t", "-l", logfile, "--root", fixturefile], env=env, cwd=cachedir,
+            stdout=null, stderr=null)
+
+def collectlive(cachefile):
+    # collect() on this system with the probe cache of cachefile
+    return collect(logger=log, cache=probecache(logger=log, filename=cachefile))
+
+def displaystage(c):
+    c.getlspci()
+    c.getmoduledrivers()
+    return c.getdisplayinfo()
+
+def networkstage(c):
+    c.getlspci()
+    c.getlsusb()
+    return c.getnetworkinfo()
+
+def makestages(root, tmp):
+    """ Returns [(name, setup, func)]: func(setup()) is timed, setup() is not """
+    text = unreplacedtext(root)
+    c = newcore(root)
+    warmfile = os.path.join(tmp, "warm.json")
+    collectlive(warmfile) # Fills the probe cache
+    emptydir = lambda: tempfile.mkdtemp(dir=tmp)
+    emptyfile = lambda: os.path.join(emptydir(), "probes.json")
+    return [
+        ("grub", lambda: root, lambda r: osgrubber(logger=log, root=r).returnall()),
+        ("dicreplace", lambda: text, c.dicreplace),
+        ("display", lambda: newcore(root), displaystage),
+        ("network", lambda: newcore(root), networkstage),
+        ("cpu", lambda: newcore(root), lambda c: c.getcpuinfo()),
+        ("memory", lambda: newcore(root), lambda c: c.getmeminfo()),
+        ("render", lambda: root, lambda r: render(collect(logger=log, root=r))),
+        ("process", emptydir, runprocess),
+        ("cold", emptyfile, collectlive),
+        ("warm", lambda: warmfile, collectlive),
+    ]
+
+def runstage(setup, func, rounds, roundtime=0.02):
+    """ Returns the times per call of every round """
+    def oneround(number):
+        total = 0.0
+        for i in range(number):
+            state = setup()
+            t = timer()
+            func(state)
+            total += timer() - t
+        return total
+    func(setup()) # Warm up (imports, vendor table, first reads)
+    number = 1
+    while True:
+        t = oneround(number)
+        if t >= roundtime or number >= 100000:
+            break
+        number *= 10 if t < roundtime / 10 else 2
+    return [oneround(number) / number for i in range(rounds)]
+
+def median(values):
+    s = sorted(values)
+    n = len(s)
+    return s[n // 2] if n % 2 else (s[n // 2 - 1] + s[n // 2]) / 2.0
+
+def stdev(values):
+    m = sum(values) / len(values)
+    return (sum((v - m) ** 2 for v in values) / max(1, len(values) - 1)) ** 0.5
+
+def formattime(seconds):
+    if seconds >= 1e-3:
+        return "{0:.2f}ms".format(seconds * 1e3)
+    return "{0:.1f}µs".format(seconds * 1e6)
+
+def loadbaselines(filename):
+    try:
+        with open(filename, "r") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {"stages": {}}
+
+def main():
+    parser = argparse.ArgumentParser(description='Stage benchmarks')
+    parser.add_argument('--rounds', type=int, default=15)
+    parser.add_argument('--stage', action='append', help='Only this stage (repeatable)')
+    parser.add_argument('--threshold', type=float, default=None,
+    help='Allowed slowdown over the baseline median (default: from the baselines, else 0.3)')
+    parser.add_argument('--baselines', default=baselinefile)
+    parser.add_argument('--save', action='store_true', help='Store this run as the baselines')
+    args = parser.parse_args()
+
+    baselines = loadbaselines(args.baselines)
+    thresholds = baselines.get("thresholds", {})
+    if baselines.get("python") and baselines["python"] != platform.python_version():
+        print("Baselines of python {0}, running python {1}".format(
+            baselines["python"], platform.python_version()))
+    tmp = tempfile.mkdtemp()
+    root = sysroot.openroot(fixturefile)
+    results = dict()
+    failed = list()
+    try:
+        stages = makestages(root, tmp)
+        print("{0:<11} {1:>10} {2:>8} {3:>10} {4:>10} {5:>8}".format(
+            "stage", "median", "stdev", "min", "baseline", "change"))
+        for (name, setup, func) in stages:
+            if args.stage and not name in args.stage:
+                continue
+            times = runstage(setup, func, args.rounds)
+            m = median(times)
+            results[name] = dict((k, float("{0:.4g}".format(v))) for (k, v) in
+                (("median", m), ("stdev", stdev(times)), ("min", min(times))))
+            base = baselines["stages"].get(name, {}).get("median")
+            if base:
+                change = m / base - 1
+                threshold = args.threshold if args.threshold is not None else thresholds.get(name, 0.3)
+                status = "{0:+.0%}".format(change)
+                if change > threshold and m - base > minchange:
+                    status += " FAIL"
+                    failed.append(name)
+                basetext = formattime(base)
+            else:
+                (basetext, status) = ("-", "new")
+            print("{0:<11} {1:>10} {2:>7.1%} {3:>10} {4:>10} {5:>8}".format(
+                name, formattime(m), results[name]["stdev"] / m,
+                formattime(results[name]["min"]), basetext, status))
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(tmp)
+    if "cold" in results and "warm" in results:
+        if results["warm"]["median"] >= results["cold"]["median"]:
+            print("The probe cache does not speed up collect(): warm {0}, cold {1}".format(
+                formattime(results["warm"]["median"]), formattime(results["cold"]["median"])))
+            failed.append("warm")
+    if args.save:
+        baselines["stages"].update(results)
+        baselines["python"] = platform.python_version()
+        baselines["machine"] = platform.machine()
+        baselines.setdefault("thresholds", {"process": 0.3})
+        with open(args.baselines, "w") as f:
+            json.dump(baselines, f, indent=1, sort_keys=True)
+            f.write("\n")
+        print("Baselines saved to {0}".format(args.baselines))
+        return 0
+    if failed:
+        print("Slower than the baselines: {0}".format(", ".join(failed)))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
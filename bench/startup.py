@@ -0,0 +1,92 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: bench/startup.py
+# Purpose: Import time budget of the text-only startup (init.py -t)
+# Requires: python 3.7 (-X importtime)
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Runs "python -X importtime init.py -t" a few times and fails (exit
+    status 1) if the median total import time is over the budget, or if
+    a gui module (gi, gtk, mechanize) is imported at all.
+    Usage: python3 bench/startup.py [budget in ms] [runs]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+topdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Text-only output must not import these (top-level names)
+guimodules = ("gi", "gtk", "gobject", "pygtk", "mechanize")
+budget = 85.0 # ms, about 60ms in 2026 on a 1 vcpu VM (logging.handlers: 8ms)
+
+
+def importtimes():
+    """ Runs init.py -t once, returns dictionary
+        {module: (cumulative us, True for top-level imports)}
+    """
+    # The log and the caches of init.py go to a temporary directory
+    cwd = tempfile.mkdtemp()
+    env = dict(os.environ, XDG_STATE_HOME=cwd, XDG_CACHE_HOME=cwd)
+    try:
+        p = subprocess.Popen([sys.executable, "-X", "importtime",
+            os.path.join(topdir, "init.py"), "-t"], cwd=cwd, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        (out, err) = p.communicate()
+    finally:
+        shutil.rmtree(cwd)
+    times = dict()
+    for line in err.splitlines():
+        # "import time:       270 |       8873 |   probecache"
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        times[name.strip()] = (int(fields[1]), not name.startswith("  "))
+    return times
+
+def main():
+    limit = float(sys.argv[1]) if len(sys.argv) > 1 else budget
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    totals = list()
+    for i in range(runs):
+        times = importtimes()
+        gui = sorted(m for m in times if m.split(".")[0] in guimodules)
+        if gui:
+            print("FAIL: text-only startup imports {0}".format(", ".join(gui)))
+            return 1
+        totals.append(sum(us for (us, top) in times.values() if top) / 1000.0)
+    totals.sort()
+    median = totals[len(totals) // 2]
+    slowest = sorted(((us, m) for (m, (us, top)) in times.items() if top), reverse=True)[:5]
+    print("Import time: median {0:.1f}ms (min {1:.1f}ms, max {2:.1f}ms), budget {3:.1f}ms".format(
+        median, totals[0], totals[-1], limit))
+    for (us, m) in slowest:
+        print("  {0:>8.1f}ms {1}".format(us / 1000.0, m))
+    if median > limit:
+        print("FAIL: over budget")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+# File: commandrunner.py
+# Purpose: Runs external commands without a shell, concurrently and with timeouts
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import sys
+import errno
+import threading
+import time
+
+py3 = sys.version_info[0] >= 3
+subprocess = None # Imported by the first start(), most runs use sysfs only
+devnull = None
+
+
+def loadsubprocess():
+    global subprocess, devnull
+    if subprocess is None:
+        import subprocess as module
+        # stderr of the commands is dropped (subprocess.DEVNULL needs python 3.3)
+        devnull = getattr(module, "DEVNULL", None) or open(os.devnull, "w")
+        subprocess = module
+
+
+class commandrunner:
+    """ Runs argv lists (no shell) with a per-command timeout and a global
+        deadline shared by all the commands of the runner, counted from
+        its first command. A command that fails, is missing or hangs
+        (e.g. lspci on broken PCI hardware) returns an empty string and is
+        killed if needed.
+        The runtime of every command is kept in self.timings.
+
+        Example:
+            r = commandrunner(logger=log, timeout=5, deadline=20)
+            lspci = r.run(["lspci", "-nn"])
+    """
+    def __init__(self, logger, timeout=10, deadline=30):
+        self.log = logger
+        self.timeout = timeout
+        self.budget = deadline
+        self.deadline = None # Set by the first run()
+        self.timings = list() # [(argv, seconds, returncode)], None: not run/killed
+        self.lock = threading.Lock()
+
+    def endtime(self, started, timeout=None):
+        # When a command has to finish: its timeout, cut by the global deadline
+        end = started + (self.timeout if timeout is None else timeout)
+        if self.deadline is not None:
+            end = min(end, self.deadline)
+        return end
+
+    def start(self, argv):
+        """ Starts a command and a thread collecting its output.
+            Returns (Popen, thread, result list), or None if the command
+            cannot be started.
+        """
+        loadsubprocess()
+        try:
+            p = subprocess.Popen(argv, stdout=subprocess.PIPE,
+                stderr=devnull, close_fds=True)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                # Optional tool that is not installed, e.g. lsusb
+                self.log.debug("Command '%s' is not installed", argv[0])
+            else:
+                self.log.error("Could not run '%s': %s", ' '.join(argv), e.strerror)
+            return None
+        result = list()
+        def communicate():
+            result.append((p.communicate()[0], time.time()))
+        t = threading.Thread(target=communicate)
+        t.daemon = True
+        t.start()
+        return (p, t, result)
+
+    def finish(self, argv, running, started, timeout):
+        # Waits for a started command, returns its output
+        (p, t, result) = running
+        t.join(max(self.endtime(started, timeout) - time.time(), 0))
+        if t.is_alive():
+            self.log.error("Command '%s' timed out, killing it", ' '.join(argv))
+            try:
+                p.kill()
+            except OSError:
+                pass
+            t.join(1)
+            output = ""
+            returncode = None
+            elapsed = time.time() - started
+        else:
+            (output, ended) = result[0]
+            returncode = p.returncode
+            elapsed = ended - started
+        with self.lock:
+            self.timings.append((argv, elapsed, returncode))
+        self.log.debug("Command '%s' finished in %.3fs (exit status %s)",
+            ' '.join(argv), elapsed, returncode)
+        if py3 and isinstance(output, bytes):
+            output = output.decode("utf-8", "replace")
+        return output.rstrip("\n")
+
+    def run(self, argv, timeout=None):
+        """ Runs a command, returns its output (stdout) as a string """
+        started = time.time()
+        with self.lock:
+            if self.deadline is None and self.budget:
+                self.deadline = started + self.budget
+        running = self.start(argv)
+        if running is None:
+            with self.lock:
+                self.timings.append((argv, 0.0, None))
+            return ""
+        return self.finish(argv, running, started, timeout)
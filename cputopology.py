@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# File: cputopology.py
+# Purpose: CPU model name and socket/core/thread/NUMA counts
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The topology is read from the cpumask files of
+    /sys/devices/system/cpu/cpu*/topology, e.g. thread_siblings "00000000,00000003"
+    is the mask of cpu0 and cpu1 (bits 0 and 1). A mask is read for one cpu and
+    its bits are removed from the cpus left to count, so only one file per core
+    and one per socket is read, not one per thread.
+"""
+
+import os.path
+
+from sysroot import live
+
+cpudir = "/sys/devices/system/cpu"
+nodedir = "/sys/devices/system/node"
+# Keys of the model name line in /proc/cpuinfo (x86, older ARM)
+modelkeys = ("model name", "Processor", "cpu model")
+
+
+def parsemask(text):
+    # "00000000,00000003" => 3
+    return int(text.strip().replace(",", "") or "0", 16)
+
+def parselist(text):
+    # "0-3,8-11" => mask of cpus 0,1,2,3,8,9,10,11
+    mask = 0
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        (first, sep, last) = part.partition("-")
+        first = int(first)
+        last = int(last) if sep else first
+        mask |= ((1 << (last - first + 1)) - 1) << first
+    return mask
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+def lowestbit(mask):
+    # Number of the lowest set bit: 12 (0b1100) => 2
+    return (mask & -mask).bit_length() - 1
+
+def cpumodel(filename="/proc/cpuinfo", root=live):
+    """ Returns the first model name of /proc/cpuinfo, or None.
+        Stops reading at the first match (the file is large on many-core hosts).
+    """
+    try:
+        with root.open(filename) as f:
+            for line in f:
+                (key, sep, value) = line.partition(":")
+                if sep and key.strip() in modelkeys:
+                    return value.strip()
+    except IOError:
+        pass
+    return None
+
+def countgroups(cpus, maskfiles, root=live):
+    """ Counts the groups (cores or sockets) of the cpus mask.
+        maskfiles: names of the topology mask file, newest first
+        Returns None if the mask files are missing.
+    """
+    count = 0
+    left = cpus
+    while left:
+        cpu = lowestbit(left)
+        group = None
+        for name in maskfiles:
+            try:
+                group = parsemask(root.read(os.path.join(cpudir,
+                    "cpu{0}".format(cpu), "topology", name)))
+                break
+            except (IOError, ValueError):
+                pass
+        if not group:
+            return None
+        left &= ~(group | (1 << cpu))
+        count += 1
+    return count
+
+def cputopology(root=live):
+    """ Returns dictionary {'sockets': 2, 'cores': 128, 'threads': 256, 'numa': 2}
+        with totals of the online cpus, or None if sysfs is not available.
+    """
+    try:
+        cpus = parselist(root.read(os.path.join(cpudir, "online")))
+    except (IOError, ValueError):
+        return None
+    if not cpus:
+        return None
+    cores = countgroups(cpus, ("core_cpus", "thread_siblings"), root)
+    sockets = countgroups(cpus, ("package_cpus", "core_siblings"), root)
+    if cores is None or sockets is None:
+        return None
+    try:
+        numa = popcount(parselist(root.read(os.path.join(nodedir, "online"))))
+    except (IOError, ValueError):
+        numa = 1
+    return {"sockets": sockets, "cores": cores, "threads": popcount(cpus), "numa": numa}
+
+def topologystring(t):
+    # Cores/threads per socket: '4C/8T', '2x 64C/128T'
+    s = "{0}C/{1}T".format(t["cores"] // t["sockets"], t["threads"] // t["sockets"])
+    if t["sockets"] > 1:
+        s = "{0}x {1}".format(t["sockets"], s)
+    return s
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: fleet.py
+# Purpose: Renders the signatures of many captured systems on a process pool
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Every root (a capture directory or archive, see sysroot) is probed in a
+    worker process and written as one JSON line, in completion order:
+        {"root": "captures/host1.tar.gz", "seconds": 0.004,
+         "signature": {"knowledge": ..., "info": {"cpu": ...}, ...},
+         "text": "1 Γνώσεις Linux: ..."}
+        {"root": "captures/host2", "error": "[Errno 2] No such file or directory: ..."}
+
+    Usage:
+        python fleet.py captures/*.tar.gz > signatures.ndjson
+        find captures -name '*.zip' | python fleet.py --from - -j 16
+
+    Roots are sent to the workers in chunks, and only a few chunks per
+    worker are queued at a time, so memory does not grow with the number
+    of roots (they may come from a generator or a pipe).
+"""
+
+import sys
+import json
+import time
+import logging
+import itertools
+try:
+    import queue
+except ImportError:
+    import Queue as queue # python2
+
+log = logging.getLogger("forum-signature.fleet")
+log.addHandler(logging.NullHandler())
+
+
+def initworker():
+    # Ctrl-C is handled by the parent, which terminates the pool
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def proberoot(path):
+    """ Returns (failed, JSON line) of a root """
+    import forum_signature_gtk3
+    import records
+    import sysroot
+    started = time.time()
+    try:
+        root = sysroot.openroot(path)
+        try:
+            s = forum_signature_gtk3.collect(usecache=False, logger=log, root=root)
+        finally:
+            root.close()
+        d = {
+            "root": path,
+            "seconds": round(time.time() - started, 6),
+            "signature": records.todict(s),
+            "text": forum_signature_gtk3.render(s),
+        }
+    except Exception as e:
+        # One broken capture must not stop the others
+        d = {"root": path, "error": str(e) or type(e).__name__}
+    return ("error" in d, json.dumps(d, sort_keys=True))
+
+def probechunk(paths):
+    # Worker task: a list of proberoot() results
+    return [proberoot(p) for p in paths]
+
+def chunks(iterable, size):
+    # [1, 2, 3, 4, 5], 2 => [1, 2], [3, 4], [5]
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class fleet:
+    """ Probes roots on a multiprocessing pool.
+
+        Example:
+            f = fleet(processes=8)
+            for line in f.run(["captures/host1.tar.gz", "captures/host2"]):
+                print(line)
+            f.failed # Number of roots with an error
+    """
+    def __init__(self, processes=None, chunksize=8, inflight=2):
+        import multiprocessing
+        self.processes = processes or multiprocessing.cpu_count()
+        self.chunksize = chunksize
+        # Chunks queued per worker: enough to keep the workers busy while
+        # the parent writes results
+        self.maxpending = self.processes * inflight
+        self.pool = None
+        self.done = 0
+        self.failed = 0
+
+    def run(self, roots):
+        """ Yields the JSON lines of roots, in completion order """
+        import multiprocessing
+        results = queue.Queue()
+        callbacks = {"callback": results.put}
+        if sys.version_info[0] >= 3:
+            callbacks["error_callback"] = results.put # python 3.2
+        self.pool = multiprocessing.Pool(self.processes, initworker)
+        try:
+            pending = 0
+            tasks = chunks(roots, self.chunksize)
+            left = True
+            while left or pending:
+                while left and pending < self.maxpending:
+                    try:
+                        chunk = next(tasks)
+                    except StopIteration:
+                        left = False
+                        break
+                    self.pool.apply_async(probechunk, (chunk,), **callbacks)
+                    pending += 1
+                if not pending:
+                    break
+                lines = results.get()
+                pending -= 1
+                if isinstance(lines, BaseException):
+                    raise lines
+                for (failed, line) in lines:
+                    self.done += 1
+                    self.failed += failed
+                    yield line
+            self.pool.close()
+        except BaseException:
+            self.pool.terminate()
+            raise
+        finally:
+            self.pool.join()
+            self.pool = None
+
+
+def readroots(filename):
+    # One root per line, "-" is stdin
+    f = sys.stdin if filename == "-" else open(filename, "r")
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def parsearguments(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Render the signatures of '
+        'captured systems as JSON lines')
+    parser.add_argument('roots', nargs='*', metavar='ROOT',
+    help='Capture directory or archive')
+    parser.add_argument('-f', '--from', dest='rootsfile', metavar='FILE',
+    help='Read the roots from FILE, one per line ("-": stdin)')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+    help='Worker processes (default: number of cpus)')
+    parser.add_argument('-c', '--chunk-size', type=int, default=8,
+    help='Roots per worker task (default: %(default)s)')
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parsearguments(argv)
+    roots = iter(args.roots)
+    if args.rootsfile:
+        roots = itertools.chain(roots, readroots(args.rootsfile))
+    f = fleet(processes=args.processes, chunksize=args.chunk_size)
+    started = time.time()
+    out = sys.stdout
+    try:
+        for line in f.run(roots):
+            out.write(line + "\n")
+        out.flush()
+    except KeyboardInterrupt:
+        out.flush()
+        return 130
+    seconds = time.time() - started
+    sys.stderr.write("{0} roots ({1} failed) in {2:.1f}s, {3:.0f} roots/s, {4} processes\n".format(
+        f.done, f.failed, seconds, f.done / seconds if seconds else 0, f.processes))
+    return 1 if f.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
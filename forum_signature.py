@@ -43,6 +43,8 @@ import time
 import glob
 import logging
 
+from vendortable import gettable
+
 try:
     import argparse
     # PARSE ARGUMENTS
@@ -106,53 +108,11 @@ class core:
         self.log = logger
         self.pyversion = platform.python_version()
         self.unknown = "�" # Character/string for unknown data
-        # Dictionary for dicreplace(), executed at returnall()
-        self.dic = {
-            "MICRO-STAR INTERNATIONAL CO.,LTD": "MSI",
-            "MICRO-STAR INTERNATIONAL CO., LTD": "MSI",
-            "Marvell Technology Group Ltd.": "Marvell",
-            "Hewlett-Packard HP": "HP",
-            "Broadcom Corporation": "Broadcom",
-            "Silicon Integrated Systems [SiS]": "SiS",
-            "Atheros Communications, Inc.": "Atheros",
-            "Atheros Communications": "Atheros",
-            "Atheros Inc.": "Atheros",
-            "Acer, Inc.": "Acer",
-            "ASUSTek Computer, Inc.": "ASUSTek",
-            "Atheros Inc.": "Atheros",
-            "ATI Technologies Inc": "ATI",
-            "Gigabyte Technology Co., Ltd.": "Gigabyte",
-            "VIA Technologies, Inc.": "VIA",
-            "ASUSTeK Computer": "ASUS",
-            "Intel Corporation": "Intel",
-            "Apple Inc.": "Apple",
-            "American Megatrends": "AMI?",
-            "Phoenix Technologies": "Phoenix",
-            "InnoTek": "Innotek",
-            "Realtek Semiconductor Co., Ltd.": "Realtek",
-            "Realtek Semiconductor Corp.": "Realtek",
-            "nVidia Corporation": "nVidia",
-            "ASUS INC.": "ASUS",
-            "Ralink corp.": "Ralink",
-            "Huawei Technologies Co., Ltd.": "Huawei",
-            "NetGear, Inc.": "NetGear",
-            "NVIDIA Corporation": "nVidia",
-            "Accton Technology Corp.": "Accton",
-            "Advanced Micro Devices [AMD] nee ATI": "AMD/ATI",
-            "Advanced Micro Devices [AMD]": "AMD",
-            "(R)": "",
-            "(TM)": "",
-            "(r)": "",
-            "(tm)": "",
-            "     ": " ",
-            "  @ ": " ",
-        }
-        # Array for removing default motherboard vendor values
-        self.defcoreid = [
-            "System manufacturer",
-            "System Product Name",
-            "To Be Filled By O.E.M.",
-        ]
+        # Vendor abbreviations for dicreplace(), executed at returnall(), and
+        # default motherboard vendor values for deldefcoreid() (vendors.json)
+        self.vendors = gettable()
+        self.dic = self.vendors.dic
+        self.defcoreid = self.vendors.defaults
         self.info = {
             "cpu": self.unknown,
             "memory": self.unknown,
@@ -297,18 +257,9 @@ class core:
 
     def dicreplace(self, text):
         # self.dic is already prepared
-        # METHOD 1
-        #rx = re.compile('|'.join(map(re.escape, dic)))
-        #def repl(m):
-            #return dic[m.group(0)]
-        #nt = rx.sub(repl, text)
-        #return nt
-        # METHOD 2
-        # string.replace will get worse times as dictionary gets bigger
-        s = text
-        for key,val in list(self.dic.items()):
-            ns = s.replace(key, val)
-            s = ns
+        # All keys are replaced in a single pass (see vendornormalizer)
+        s = self.vendors.replace(text)
+        s = re.sub("[ ]+", " ", s) #clear double or triple spaces
         return s
 
     def getlspci(self):
@@ -25,140 +25,194 @@
 3 Intel Core2 Duo CPU E6550 2.33GHz ‖ RAM 3961 MiB ‖ MSI MS-7235
 4 nVidia G73 [GeForce 7300 GT] [10de:0393] (rev a1)
 5 eth0: Realtek RTL-8110SC/8169SC Gigabit Ethernet [10ec:8167] (rev 10) ⋮ eth1: Realtek RTL-8139/8139C/8139C+ [10ec:8139] (rev 10)
-"""
 
-import platform
-pyversion = platform.python_version()
-if pyversion < '2.7':
-    exit('ERROR: You need python 2.7 or higher to use this program.')
-if platform.system() != "Linux":
-    exit('ERROR: This script is built for GNU/Linux platforms (for now)')
+    Importing this module has no side effects, it can be used as a library:
+        import forum_signature_gtk3
+        s = forum_signature_gtk3.collect()
+        s.info.cpu
+        'Intel Core2 Duo CPU E6550 2.33GHz'
+        print(forum_signature_gtk3.render(s))
+    or render the signature of a captured machine (see sysroot):
+        s = forum_signature_gtk3.collect(root="captures/host1.tar.gz")
+"""
 
 import sys
+pyversion = "{0}.{1}.{2}".format(*sys.version_info[:3])
+
 import os
 import os.path
 import re
-import subprocess
 import time
-import glob
 import logging
+import threading
+
+from probescheduler import probescheduler
+from probecache import probecache
+from vendortable import gettable
+from commandrunner import commandrunner
+import sysfsdevices
+import cputopology
+import grubparser
+from grubrules import grubrules
+import osfacts
+from mounttable import mounttable, getmounttable
+import sysroot
+from records import signature, hostfacts, bootentry, hostinfo
+from logpipeline import logpipeline
 
-import argparse
-# PARSE ARGUMENTS
-parser = argparse.ArgumentParser(description='Process some integers.')
-parser.add_argument('-d', '--debug', action='store_true',
-help='Debug (print out useful debug data)')
-parser.add_argument('-t', '--text-only', action='store_true',
-help='Print to console/terminal only')
-args = parser.parse_args()
-print(args)
+log = logging.getLogger("forum-signature")
+log.addHandler(logging.NullHandler()) # No output unless main() sets it up
+
+def statedirectory():
+    # $XDG_STATE_HOME/forum-signature, e.g. ~/.local/state/forum-signature
+    d = os.getenv("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(d, "forum-signature")
+
+# Log file, "-l" or $FORUM_SIGNATURE_LOG
+logfile = os.getenv("FORUM_SIGNATURE_LOG") or os.path.join(statedirectory(), "forum-signature.log")
+logginglock = threading.Lock()
+pipeline = None # logpipeline of main(), see setuplogging()
+
+# gi.repository modules, set by loadgui()
+Gtk = None
+Gdk = None
+GObject = None
+
+def parsearguments(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description='Process some integers.')
+    parser.add_argument('-d', '--debug', action='store_true',
+    help='Debug (print out useful debug data)')
+    parser.add_argument('-t', '--text-only', action='store_true',
+    help='Print to console/terminal only')
+    parser.add_argument('-n', '--no-cache', action='store_true',
+    help='Probe everything again, ignoring cached results')
+    parser.add_argument('-l', '--log-file', default=logfile,
+    help='Log file, rotated at 1 MiB (default: %(default)s)')
+    parser.add_argument('--watch', action='store_true',
+    help='Print the changes of the signature (JSON lines) until interrupted')
+    parser.add_argument('-r', '--root', metavar='PATH',
+    help='Probe a captured system instead of this one: a directory or a '
+    'tar/zip archive of its /proc, /sys, /boot and /etc files, or a snapshot')
+    parser.add_argument('--capture', metavar='FILE',
+    help='Write the probe inputs of this system (or of --root) to a '
+    'snapshot file, replayable with --root FILE')
+    parser.add_argument('--daemon', nargs='?', const='', metavar='SOCKET',
+    help='Serve the signature (text or json) on a Unix socket '
+    '(default: $XDG_RUNTIME_DIR/forum-signature.sock)')
+    return parser.parse_args(argv)
+
+def setuplogging(debug=False, filename=None):
+    """ Logs to filename (rotated, see logpipeline) and to stdout, once per
+        process. Returns the logpipeline, stop() it before exiting.
+    """
+    global pipeline
+    with logginglock:
+        if pipeline is None:
+            pipeline = logpipeline(log, filename=filename or logfile)
+            pipeline.start()
+        if debug:
+            log.setLevel(logging.DEBUG)
+        else:
+            log.setLevel(logging.INFO)
+        return pipeline
+
+def findmodule(name):
+    # True if a top-level module can be imported, without importing it
+    try:
+        import importlib.util
+        return importlib.util.find_spec(name) is not None
+    except ImportError: # python 2
+        import imp
+        try:
+            imp.find_module(name)
+            return True
+        except ImportError:
+            return False
 
+def typelibdirectories():
+    dirs = [d for d in os.getenv("GI_TYPELIB_PATH", "").split(":") if d]
+    dirs += ["/usr/lib/girepository-1.0", "/usr/lib64/girepository-1.0",
+        "/usr/local/lib/girepository-1.0"]
+    # Multiarch: /usr/lib/x86_64-linux-gnu/girepository-1.0
+    try:
+        dirs += [os.path.join("/usr/lib", d, "girepository-1.0")
+            for d in os.listdir("/usr/lib") if "-linux-" in d]
+    except OSError:
+        pass
+    return dirs
+
+def guiavailable():
+    """ Returns True if python-gi and the gtk+ 3 typelib are installed.
+        Nothing is imported, see loadgui().
+    """
+    if not findmodule("gi"):
+        return False
+    return any(os.path.isfile(os.path.join(d, "Gtk-3.0.typelib"))
+        for d in typelibdirectories())
+
+def loadgui():
+    """ Imports the gtk+ 3 modules, returns False if they are not available """
+    global Gtk, Gdk, GObject
+    if not guiavailable():
+        log.error("Could not find gtk+ 3 module. Setting text-only output.\n")
+        return False
+    try:
+        from gi.repository import Gtk, Gdk
+    except (ImportError, RuntimeError):
+        log.error("Could not load gtk+ 3 module. Setting text-only output.\n")
+        return False
+    try:
+        from gi.repository import GObject
+    except ImportError:
+        log.error("Could not load gobject module. Setting text-only output.\n")
+        return False
+    return True
 
-# LOGS
-log = logging.getLogger("forum-signature")
-logfile = "forum-signature.log"
-if os.path.isfile(logfile):
-    os.remove(logfile)
-formatter = logging.Formatter('%(levelname)s: %(message)s')
-filehandler = logging.FileHandler(logfile)
-filehandler.setFormatter(formatter)
-streamhandler = logging.StreamHandler(sys.stdout)
-streamhandler.setFormatter(formatter)
-log.addHandler(filehandler)
-log.addHandler(streamhandler)
-if args.debug:
-    log.setLevel(logging.DEBUG)
-else:
-    log.setLevel(logging.INFO)
-log.debug("parsing arguments: {0}".format(args))
-log.debug("osgrubber().returnall()")
-
-try:
-    from gi.repository import Gtk, Gdk
-except (ImportError, RuntimeError):
-    log.error("Could not load gtk+ 3 module. Setting text-only output.\n")
-    args.text_only = True
-try:
-    from gi.repository import GObject
-except ImportError:
-    log.error("Could not load gobject module. Setting text-only output.\n")
-    args.text_only = True
+# network card ids in /sys/class/net/*/device/modalias
+pcimodalias = re.compile("v0000([0-9A-Z]+)d0000([0-9A-Z]+)s")
+usbmodalias = re.compile("v([0-9A-Z]+)p([0-9A-Z]+)d")
+# vendor:device ids in lspci -nn and lsusb output
+lspciids = re.compile("\[([0-9a-fA-F]{4}):([0-9a-fA-F]{4})\]")
+lsusbline = re.compile("^Bus\s\d+\sDevice\s\d+:\sID\s(([0-9a-fA-F]{4}:[0-9a-fA-F]{4}).*)$")
 
 class core:
-    def __init__(self, osgrubber, logger):
+    def __init__(self, osgrubber, logger, scheduler=None, cache=None, reader=None,
+            runner=None, root=None):
         self.osgrubbertuple = osgrubber
         self.log = logger
-        self.pyversion = platform.python_version()
+        self.root = root or sysroot.live # Files and command outputs of the probed system
+        self.reader = reader or self.root.reader(memo=True)
+        self.runner = runner or commandrunner(logger=self.log)
+        self.pyversion = pyversion
         self.unknown = "�" # Character/string for unknown data
-        # Dictionary for dicreplace(), executed at returnall()
-        self.dic = {
-            "MICRO-STAR INTERNATIONAL CO.,LTD": "MSI",
-            "MICRO-STAR INTERNATIONAL CO., LTD": "MSI",
-            "Marvell Technology Group Ltd.": "Marvell",
-            "Hewlett-Packard HP": "HP",
-            "Broadcom Corporation": "Broadcom",
-            "Silicon Integrated Systems [SiS]": "SiS",
-            "Atheros Communications, Inc.": "Atheros",
-            "Atheros Communications": "Atheros",
-            "Atheros Inc.": "Atheros",
-            "Acer, Inc.": "Acer",
-            "ASUSTek Computer, Inc.": "ASUS",
-            "ASUSTeK COMPUTER INC.": "ASUS",
-            "ASUSTeK Computer": "ASUS",
-            "Atheros Inc.": "Atheros",
-            "ATI Technologies Inc": "ATI",
-            "Gigabyte Technology Co., Ltd.": "Gigabyte",
-            "VIA Technologies, Inc.": "VIA",
-            "Intel Corporation": "Intel",
-            "Apple Inc.": "Apple",
-            "American Megatrends": "AMI?",
-            "Phoenix Technologies": "Phoenix",
-            "InnoTek": "Innotek",
-            "Realtek Semiconductor Co., Ltd.": "Realtek",
-            "Realtek Semiconductor Corp.": "Realtek",
-            "nVidia Corporation": "nVidia",
-            "ASUS INC.": "ASUS",
-            "Ralink corp.": "Ralink",
-            "Huawei Technologies Co., Ltd.": "Huawei",
-            "NetGear, Inc.": "NetGear",
-            "NVIDIA Corporation": "nVidia",
-            "Accton Technology Corp.": "Accton",
-            "Advanced Micro Devices [AMD] nee ATI": "AMD/ATI",
-            "Advanced Micro Devices [AMD]": "AMD",
-            "Integrated Graphics Controller": "Integrated Graphics",
-            "PCI Express Fast Ethernet controller": "Ethernet",
-            "Wireless LAN Controller": "Wireless",
-            "http://www.": "",
-            "abit.com.tw/": "",
-            "(R)": "",
-            "(TM)": "",
-            "(r)": "",
-            "(tm)": "",
-            "  @ ": " ",
-        }
-        # Array for removing default motherboard vendor values
-        self.defcoreid = [
-            "System manufacturer",
-            "System Product Name",
-            "To Be Filled By O.E.M.",
-        ]
-        self.info = {
-            "cpu": self.unknown,
-            "memory": self.unknown,
-            "display": list(self.unknown),
-            "system": self.unknown,
-            "core": self.unknown,
-            "network": self.unknown,
-        }
+        # Vendor abbreviations for dicreplace(), executed at returnall(), and
+        # default motherboard vendor values for deldefcoreid() (vendors.json)
+        self.vendors = gettable()
+        self.dic = self.vendors.dic
+        self.defcoreid = self.vendors.defaults
+        self.info = hostinfo(
+            cpu=self.unknown,
+            memory=self.unknown,
+            display=list(self.unknown),
+            system=self.unknown,
+            core=self.unknown,
+            network=self.unknown,
+        )
         self.lspci = ""
         self.lsusb = ""
         self.moduledrivers = dict()
         self.displaymanager = ""
-        self.getlspci()
-        self.getlsusb()
-        self.getmoduledrivers()
-        self.getdisplaymanager()
-        self.getinfo()
+        self.pci = None # sysfsdevices.pciinventory, see getpciinventory()
+        self.pcilock = threading.Lock()
+        # If a scheduler is given, the probes are only added to it and the
+        # caller runs it (e.g. together with osgrubber probes)
+        if scheduler is None:
+            scheduler = probescheduler(logger=self.log)
+            self.addprobes(scheduler, cache)
+            scheduler.run()
+        else:
+            self.addprobes(scheduler, cache)
 
     def printall(self):
         print(self.returnall())
@@ -181,19 +235,18 @@ class core:
 
     def osinfo(self):
         """ Returns OS info line (#2).
-            Input: tuple list
-            (osinfo, arch_type, iswubi, lang, self.oslist, self.osdict)
+            Input: records.hostfacts from osgrubber
         """
         t = self.osgrubbertuple
         # is it wubi installation?
-        if t[2]:
+        if t.iswubi:
             wubi = "wubi"
         else:
             wubi = ""
-        curroslist = [t[0], t[1], wubi]
-        currosstr = ' '.join(curroslist).rstrip()
-        lang = t[3]
-        restofos = ', '.join(t[4])
+        curroslist = [t.osinfo, t.arch, wubi]
+        currosstr = ' '.join(x for x in curroslist if x)
+        lang = t.lang
+        restofos = ', '.join(t.oslist)
         if restofos:
             s = "2 {0} ({1}, {2}), {3}".format(currosstr, lang, self.displaymanager, restofos)
         else:
@@ -204,11 +257,11 @@ class core:
     def specs(self):
         core = self.shortencoreid()
         text = '3 {0} ‖ RAM {1} MiB ‖ {2}\n4 {3}\n5 {4}'.format(
-            self.info["cpu"],
-            self.info["memory"],
+            self.info.cpu,
+            self.info.memory,
             core,
-            self.info["display"],
-            self.info["network"]
+            self.info.display,
+            self.info.network
         )
         return text
 
@@ -228,7 +281,7 @@ class core:
         # Shorten the machine/motherboard id and manufacturer
         u = self.unknown # "�"
         u2 = "{0} {0}".format(u) # "� �"
-        c = self.info["core"]
+        c = self.info.core
         if c[0] == c[1]:
             s = c[0]
         elif c[0] in (u,u2) and not c[1] in (u,u2):
@@ -239,12 +292,36 @@ class core:
             s = " - ".join(c)
         return s
 
-    def getinfo(self):
-        self.info["memory"] = self.getmeminfo()
-        self.info["cpu"] = self.getcpuinfo()
-        self.info["display"] = self.getdisplayinfo()
-        self.info["network"] = self.getnetworkinfo()
-        self.info["core"] = self.getcoreinfo() # Note: array
+    def addprobes(self, scheduler, cache=None):
+        """ Adds the hardware probes and their dependencies to a
+            probescheduler, so that independent probes run concurrently.
+            Probe results are taken from the probecache if their inputs
+            did not change.
+        """
+        if cache is None:
+            cache = probecache(logger=self.log, enabled=False)
+        add = scheduler.add
+        wrap = cache.wrap
+        add("lspci", wrap("lspci", self.getlspci, self.setattribute("lspci")))
+        add("lsusb", wrap("lsusb", self.getlsusb, self.setattribute("lsusb")))
+        add("moduledrivers", wrap("moduledrivers", self.getmoduledrivers,
+            self.setattribute("moduledrivers")))
+        add("displaymanager", self.getdisplaymanager)
+        add("memory", wrap("memory", self.getmeminfo, self.setinfo("memory")))
+        add("cpu", wrap("cpu", self.getcpuinfo, self.setinfo("cpu")))
+        add("display", wrap("display", self.getdisplayinfo, self.setinfo("display")),
+            deps=("lspci", "moduledrivers"))
+        add("network", wrap("network", self.getnetworkinfo, self.setinfo("network")),
+            deps=("lspci", "lsusb"))
+        add("core", wrap("core", self.getcoreinfo, self.setinfo("core"))) # Note: array
+
+    def setattribute(self, name):
+        # Returns a function storing a probe result in self.<name>
+        return lambda value: setattr(self, name, value)
+
+    def setinfo(self, key):
+        # Returns a function storing a probe result in self.info.<key>
+        return lambda value: setattr(self.info, key, value)
 
     def getcoreinfo(self):
         # Trying different files for motherboard chip identification
@@ -256,12 +333,10 @@ class core:
         }
         # Read files and strip whitespace
         try:
-            self.coreid = {
-                "board_vendor": self.getfile(f["board_vendor"]).strip(),
-                "board_name": self.getfile(f["board_name"]).strip(),
-                "sys_vendor": self.getfile(f["sys_vendor"]).strip(),
-                "product_name": self.getfile(f["product_name"]).strip(),
-            }
+            files = self.reader.readmany(f.values())
+            if None in files.values():
+                raise IOError("DMI files not found")
+            self.coreid = dict((k, files[v].strip()) for (k, v) in f.items())
             # Testing deldefcoreid()
             #self.coreid["board_vendor"] = "ASUS INC."
             #self.coreid["board_name"] = "P5Q"
@@ -292,73 +367,127 @@ class core:
 
     def dicreplace(self, text):
         # self.dic is already prepared
-        # METHOD 1
-        #rx = re.compile('|'.join(map(re.escape, dic)))
-        #def repl(m):
-            #return dic[m.group(0)]
-        #nt = rx.sub(repl, text)
-        #return nt
-        # METHOD 2
-        # string.replace will get worse times as dictionary gets bigger
-        s = text
-        for key,val in list(self.dic.items()):
-            ns = s.replace(key, val)
-            s = ns
+        # All keys are replaced in a single pass, the longest key wins
+        # where keys overlap (see vendornormalizer)
+        s = self.vendors.replace(text)
         s = re.sub("[ ]+", " ", s) #clear double or triple spaces
         return s
 
+    def getpciinventory(self):
+        # The sysfs PCI walk is done once, by the first probe needing it
+        with self.pcilock:
+            if self.pci is None:
+                self.pci = sysfsdevices.pciinventory(root=self.root)
+            return self.pci
+
     def getlspci(self):
         if not self.lspci:
-            p = ["lspci", "-nn"]
-            self.lspci = self.runcommand(p)
+            # Read sysfs directly, lspci is only used if sysfs is missing
+            pci = self.getpciinventory()
+            if pci.devices:
+                self.lspci = pci.lspcitext()
+            else:
+                p = ["lspci", "-nn"]
+                self.lspci = self.runcommand(p)
+        return self.lspci
     
     def getmoduledrivers(self):
         if not self.moduledrivers:
             #Alternative: Try using lspci -mm or -vmm or -m, e.g. lspci -vmm -v -nn -d 10de:0393
-            files = glob.glob("/sys/bus/pci/devices/*/uevent")
-            for f in files:
-                s = self.getfile(f)
-                m = re.search("DRIVER=(?P<driver>[^\n]*).*?PCI_ID=(?P<pci_id>[^\n]*)", s, re.S)
-                if m:
-                    d = m.groupdict()
-                    self.moduledrivers[d["pci_id"]] = d["driver"]
+            self.moduledrivers = self.getpciinventory().moduledrivers()
+        return self.moduledrivers
 
     def getlsusb(self):
         if not self.lsusb:
-            u = ["lsusb"]
-            self.lsusb = self.runcommand(u)
+            # Read sysfs directly, lsusb is only used if sysfs is missing
+            devices = sysfsdevices.listusb(root=self.root)
+            if devices:
+                names = sysfsdevices.usbnames(devices, root=self.root)
+                self.lsusb = sysfsdevices.lsusbtext(devices, names)
+            elif not self.root.isdir(sysfsdevices.usbdir):
+                u = ["lsusb"]
+                self.lsusb = self.runcommand(u)
+        return self.lsusb
+
+    def indexlspci(self):
+        """ Returns lspci -nn output as dictionary {'10EC:8139': description}
+            #04:01.0 Ethernet controller [0200]: Realtek Semiconductor Co., Ltd. RTL-8139/8139C/8139C+ [10ec:8139] (rev 10)
+            {'10EC:8139': 'Realtek Semiconductor Co., Ltd. RTL-8139/8139C/8139C+ [10ec:8139] (rev 10)'}
+            Only the first device of each vendor:device id is kept.
+        """
+        d = dict()
+        for line in self.lspci.splitlines():
+            desc = line.partition(": ")[2]
+            ids = lspciids.findall(desc)
+            if ids:
+                key = "{0}:{1}".format(*ids[-1]).upper()
+                if not key in d:
+                    d[key] = desc
+        return d
+
+    def indexlsusb(self):
+        """ Returns lsusb output as dictionary {'0CF3:1002': description}
+            #Bus 002 Device 004: ID 0cf3:1002 Atheros Communications, Inc. TP-Link TL-WN821N v2 [Atheros AR9001U-(2)NG]
+            {'0CF3:1002': '0cf3:1002 Atheros Communications, Inc. TP-Link TL-WN821N v2 [Atheros AR9001U-(2)NG]'}
+        """
+        d = dict()
+        for line in self.lsusb.splitlines():
+            m = lsusbline.match(line)
+            if m:
+                key = m.group(2).upper()
+                if not key in d:
+                    d[key] = m.group(1)
+        return d
 
     def getnetworkinfo(self):
-        files = glob.glob("/sys/class/net/*/device/modalias")
-        #netcards = dict()
+        netdir = "/sys/class/net"
+        pci = self.getpciinventory()
+        # lspci/lsusb are indexed once, every network card is a lookup
+        pcidevices = None
+        usbdevices = None
         netcards = list()
-        for f in files:
-            name = f.split("/")[4] # ['', 'sys', 'class', 'net', 'eth1', 'device', 'modalias'
-            s = self.getfile(f).strip()
+        append = netcards.append # PythonSpeed/PerformanceTips
+        try:
+            interfaces = sorted(self.root.listdir(netdir))
+        except OSError:
+            interfaces = list()
+        for name in interfaces:
+            device = os.path.join(netdir, name, "device")
+            try:
+                slot = os.path.basename(self.root.readlink(device))
+            except OSError:
+                continue # Virtual interface (lo, bridges, tunnels)
+            d = pci.byslot(slot)
+            if d:
+                append("{0}: {1}".format(name, pci.description(d)))
+                continue
+            try:
+                s = self.getfile(os.path.join(device, "modalias")).strip()
+            except IOError:
+                continue
             # PCI: v*d*s => [('10EC', '8139')]
-            pciids = re.findall("v0000([0-9A-Z]+)d0000([0-9A-Z]+)s", s)
+            pciids = pcimodalias.findall(s)
             #USB: v*p*d => [('0CF3', '1002')]
-            usbids = re.findall("v([0-9A-Z]+)p([0-9A-Z]+)d", s)
-            append = netcards.append # PythonSpeed/PerformanceTips
+            usbids = usbmodalias.findall(s)
             if pciids:
-                #04:01.0 Ethernet controller [0200]: Realtek Semiconductor Co., Ltd. RTL-8139/8139C/8139C+ [10ec:8139] (rev 10)
-                mp = ":\s(.*{0}:{1}.*)".format(pciids[0][0], pciids[0][1])
-                pcidesc = re.findall(mp, self.lspci, re.M+re.I)
-                if pcidesc:
-                    append("{0}: {1}".format(name, pcidesc[0]))
+                if pcidevices is None:
+                    pcidevices = self.indexlspci()
+                key = "{0}:{1}".format(*pciids[0])
+                append("{0}: {1}".format(name, pcidevices.get(key, self.unknown)))
             if usbids:
-                #Bus 002 Device 004: ID 0cf3:1002 Atheros Communications, Inc. TP-Link TL-WN821N v2 [Atheros AR9001U-(2)NG]
-                mu = ":\sID\s({0}:{1}.*)".format(usbids[0][0], usbids[0][1])
-                usbdesc = re.findall(mu, self.lsusb, re.M+re.I)
-                append("{0}: {1}".format(name, usbdesc[0]))
+                if usbdevices is None:
+                    usbdevices = self.indexlsusb()
+                key = "{0}:{1}".format(*usbids[0])
+                append("{0}: {1}".format(name, usbdevices.get(key, self.unknown)))
         network = ' ⋮ '.join(netcards)
         return network
 
     def getdisplaymanager(self):
         l = list()
+        environ = self.root.environ()
         for env in ['XDG_CURRENT_DESKTOP', 'DESKTOP_SESSION', 'GDMSESSION']:
             try:
-                e = os.environ[env]
+                e = environ[env]
                 if not e in l:
                     l.append(e)
             except KeyError:
@@ -372,6 +501,14 @@ class core:
 
     def getdisplayinfo(self):
         l = list()
+        pci = self.getpciinventory()
+        if pci.devices:
+            # VGA compatible and 3D controllers
+            for d in pci.byclass("0300", "0302"):
+                ident = "{0}:{1}".format(d.vendor, d.device)
+                l.append("{0} [{1}] {{{2}}}".format(pci.name(d), ident, d.driver))
+            return ' ⋮ '.join(l)
+        # No sysfs: lspci -nn output
         m = re.compile("(?:VGA|3D)[^:]+:\s+(.+?)\s+\[(\w+:\w+)\]", re.M)
         displays = m.findall(self.lspci)
         #01:00.0 VGA compatible controller [0300]: NVIDIA Corporation G73 [GeForce 7300 GT] [10de:0393] (rev a1)
@@ -386,17 +523,17 @@ class core:
         return graphics
 
     def getcpuinfo(self):
-        f = "/proc/cpuinfo"
-        s = self.getfile(f)
-        # Processor model name
-        match = re.search("model name\s+:\s+(.+)", s)
-        x = match.group(1)
-        # TODO: http://goo.gl/4k90P
-        ## Number of cpu cores
-        #match2 = re.search("cpu cores\s+:\s+(.+)", s)
-        #z = match2.group(1)
-        #cpu = "%sx %s" % (z, x)
-        cpu = x
+        # Processor model name, read up to the first "model name" line
+        x = cputopology.cpumodel(root=self.root)
+        if not x:
+            return self.unknown
+        # Sockets, cores and threads from the sysfs cpu masks,
+        # e.g. "AMD EPYC 7763 64-Core Processor 2x 64C/128T"
+        t = cputopology.cputopology(self.root)
+        if t:
+            cpu = "{0} {1}".format(x, cputopology.topologystring(t))
+        else:
+            cpu = x
         return cpu
 
     def getmeminfo(self):
@@ -410,35 +547,27 @@ class core:
     def getfile(self, filename, mode="string"):
         # Return file contents as a single string (string) or array list (list)
         # Default: string
-        f = open(filename, "r")
-        a = list(f.readlines())
-        if mode == "string":
-            lines = ''.join(a)
-        elif mode == "list":
-            lines = a
-        f.close()
-        return lines
+        # Every file is read only once per run (see pseudofiles)
+        s = self.reader.read(filename)
+        if mode == "list":
+            return s.splitlines(True)
+        return s
 
     def runcommand(self, command):
-        # python3 compatibility issue
-        if self.pyversion >= '3.0.0':
-            c = command
-            if type(command) == type(list()):
-                c = ' '.join(command)
-            output = subprocess.getoutput(c)
-        else:
-            p = subprocess.Popen(command, stdout=subprocess.PIPE)
-            output = p.communicate()[0]
-        return output
+        # No shell, with a timeout (see commandrunner), or the output
+        # recorded in a captured sysroot
+        if type(command) != type(list()):
+            command = command.split()
+        return self.root.run(command, self.runner)
 
 class siggui:
     """ The graphical user interface for timekpr configuration. """
     def __init__(self, text, osgrubber, logger, debug=False):
         self.debug = debug
-        #osgrubber: (osinfo, arch_type, iswubi, lang, self.oslist, self.osdict, self.morethan2)
-        self.is_wubi = osgrubber[2]
-        self.more_than_two = osgrubber[6]
         self.log = logger
+        #osgrubber: records.hostfacts
+        self.is_wubi = osgrubber.iswubi
+        self.more_than_two = osgrubber.morethan2
         self.unknown = "�"
         self.username = ""
         self.password = ""
@@ -505,31 +634,28 @@ class siggui:
         self.reportbug()
 
     def reportbug(self):
-        p = subprocess.Popen(["cat", "/proc/cpuinfo"], stdout=subprocess.PIPE)
-        outcpu = p.communicate()[0]
-
-        p = subprocess.Popen(["cat", "/proc/meminfo"], stdout=subprocess.PIPE)
-        outmem = p.communicate()[0]
-
-        p = subprocess.Popen(["lspci", "-nn"], stdout=subprocess.PIPE)
-        outlspci = p.communicate()[0]
-
-        p = subprocess.Popen("lsusb", stdout=subprocess.PIPE)
-        outlsusb = p.communicate()[0]
+        # The probe inputs go to a snapshot file (a few KB) to attach to
+        # the report, instead of pasting cpuinfo, meminfo, lspci and lsusb
+        import snapshot
+        filename = os.path.join(os.path.expanduser("~"),
+            "forum-signature-{0}.fss".format(time.strftime("%Y%m%d-%H%M%S")))
+        try:
+            (s, size) = snapshot.capture(filename, logger=self.log)
+            self.log.info("Snapshot written to %s (%d bytes)", filename, size)
+        except (IOError, OSError) as e:
+            self.log.error("Could not write the snapshot %s: %s", filename, e)
+            filename = "-"
 
         (start, end) = self.textboxbuf.get_bounds()
         sigtext = self.textboxbuf.get_text(start, end, include_hidden_chars=False)
 
         text = "Περιγράψτε το πρόβλημα στη θέση αυτού του κειμένου.\n\
-Επισυνάψτε σφάλμα από το τερματικό ή από το γραφικό περιβάλλον (αν υπάρχει).\n\n\
+Επισυνάψτε σφάλμα από το τερματικό ή από το γραφικό περιβάλλον (αν υπάρχει).\n\
+Επισυνάψτε το αρχείο: {0}\n\n\
 ------------------------\n\
 Πληροφορίες:[code]\n\
-* cpuinfo\n{0}\n\
-* meminfo:\n{1}\n\
-* lspci:\n{2}\n\
-* lsusb:\n{3}\n\
-* signature:\n{4}\n\
-[/code]".format(outcpu, outmem, outlspci, outlsusb, sigtext)
+* signature:\n{1}\n\
+[/code]".format(filename, sigtext)
 
         # SAVE TO CLIPBOARD
         clipboard = Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD)
@@ -738,12 +864,19 @@ class siggui:
 
 class osgrubber:
     """ Retrieves information about installed operating systems. """
-    def __init__(self, logger):
+    def __init__(self, logger, mounts=None, root=None):
         self.oslist = list()
         self.osdict = dict()
         self.log = logger
         self.result = ""
         self.morethan2 = set() #python2.6 or: from sets import Set as set
+        self.root = root or sysroot.live
+        if self.root.live:
+            self.rules = grubrules()
+            self.mounts = mounts or getmounttable()
+        else:
+            self.rules = grubrules(kernel=osfacts.kernel(self.root) or None)
+            self.mounts = mounts or mounttable(root=self.root)
         self.read_grub() # Sets self.oslist array
         self.finalize()
 
@@ -756,43 +889,31 @@ class osgrubber:
 
     def finalize(self):
         """ Finalizes the processing.
-            Returns a tuple list:
-            (osinfo, arch_type, iswubi, lang, self.oslist, self.osdict, self.morethan2)
+            Sets self.result to a records.hostfacts
         """
         iswubi = self.is_wubi()
-        if self.is_wubi():
-            wubi = "wubi"
-        else:
-            wubi = ""
-
         arch_type = self.machinearch()
         osinfo = self.osinfo()
         lang = self.oslang()
-        self.result = (osinfo, arch_type, iswubi, lang, self.oslist, self.osdict, self.morethan2)
+        self.result = hostfacts(osinfo, arch_type, iswubi, lang, self.oslist, self.osdict, self.morethan2)
 
     def osinfo(self):
         # Returns current OS info string
         # Return example: 'Ubuntu 12.04 precise 3.4.4-030404-generic'
-        d = platform.linux_distribution()
-        kernelver = platform.uname()[2]
-        distrib = '{0} {1}'.format(' '.join(d), kernelver)
-        return distrib
+        return osfacts.osinfo(self.root)
 
     def oslang(self):
-        lang = os.getenv("LANG", "en_US") # Assume en_US if LANG var not set
+        lang = self.root.environ().get("LANG", "en_US") # Assume en_US if LANG var not set
         return lang
 
     def machinearch(self):
-        m = platform.architecture()
-        #('64bit', 'ELF')
-        return m[0]
+        # '64bit' or '32bit'
+        return osfacts.architecture(self.root)
 
     def truncate_titles(self, t):
         """ Trucate title of OS in read_grub() """
-        s = re.sub(',? [^\s]*? Linux.*', '', t)
-        s = re.sub('\([^\)]*?\)$|\s*?\(loader\)', '', s)
-        s = re.sub('\s+', ' ', s).rstrip()
-        self.log.debug("Trimmed OS title: '{0}'".format(s))
+        s = self.rules.title(t)
+        self.log.debug("Trimmed OS title: '%s'", s)
         return s
 
     def read_grub(self):
@@ -804,148 +925,206 @@ class osgrubber:
             
             self.osdict example:
             d['hd2,msdos1']
-                [{'linuxstr': None, 'title': 'Windows 7 (on /dev/sdc1)'}]
-            d['hd2,msdos1'][0]['title']
-                'Windows 7 (on /dev/sdc1)'
+                [bootentry(title='Windows 7', linuxstr=None, version='')]
+            d['hd2,msdos1'][0].title
+                'Windows 7'
         """
         #Does grub.cfg exist?
         grub2_fname = "/boot/grub/grub.cfg"
-        if not os.path.isfile(grub2_fname):
+        if not self.root.isfile(grub2_fname):
             return False
-        with open(grub2_fname) as f:
-            grub2_cont = f.read()
+        with self.root.open(grub2_fname) as f:
+            entries = list(grubparser.parseentries(f))
 
         #Create empty dict with grub menuentry-ies
         dct = dict()
         li = list()
-        regexstr = "menuentry ['\"](?P<title>.*?)['\"].*?set root='\(?(?P<device>.*?)\)?'(?:.*?(?:chainloader.*?\n|(?:linux16|linux)\s(?P<linuxstr>.*?)\n)|.*?)"
 
-        for m in re.finditer(regexstr, grub2_cont, re.S):
-            self.log.debug("*** Matched grub line: {0}".format(m.groups()))
-            l = m.group('linuxstr')
+        for e in entries:
+            self.log.debug("*** Matched grub entry: %s", e)
+            l = e['linuxstr']
 
-            t = m.group('title')
-            if not l == None and (t == "Ubuntu" or "Fallback" in t or "ανάκτηση" in t or "fallback" in l or "recovery" in l or "memtest" in l):
-                #Ignore memtest and linux recovery grub menuentry-ies
-                self.log.debug("Blacklisted, skipping this line")
+            t = e['title']
+            if not grubparser.bootable(e):
+                # Not an OS, e.g. "UEFI Firmware Settings" (fwsetup)
+                self.log.debug("Boots no kernel or chainloader, skipping this entry")
                 continue
-            if "Recovery" in t:
-                # Ignore windows recovery
+            if self.rules.blacklisted(t, l):
+                #Ignore memtest, linux recovery and windows recovery grub menuentry-ies
                 self.log.debug("Blacklisted, skipping this line")
                 continue
-            d = m.group('device')
+            d = e['device']
 
             # Match version in linux string
-            if not l == None:
-                mre = re.match(".*vmlinuz-([^\s]*)", l)
-                if mre:
-                    v = mre.group(1)
-                    self.log.debug("Found linux version: '{0}' from '{1}'".format(v, l))
-                else:
-                    v = ""
-                    self.log.debug("Could not find linux version from '{0}'".format(l))
+            v = self.rules.version(l)
+            if v:
+                self.log.debug("Found linux version: '%s' from '%s'", v, l)
             else:
-                v = ""
-                self.log.debug("Could not find linux version from '{0}'".format(l))
-            
+                self.log.debug("Could not find linux version from '%s'", l)
+
             # Truncate titles
             tx = self.truncate_titles(t)
             ltv = " ".join([tx,v]).rstrip()
-            self.log.debug("Concatenated title and version: '{0}'".format(ltv))
+            self.log.debug("Concatenated title and version: '%s'", ltv)
             
-            if not dct.has_key(d):
+            if not d in dct:
                 dct[d] = list()
             # Keep all the OS in the dictionary
-            dct[d].append({'title': tx, 'linuxstr': l, 'version': v})
+            dct[d].append(bootentry(title=tx, linuxstr=l, version=v))
             # Do not save current OS in the list
             # Do not save more than two OS of the same partition in the list
             self.log.debug("Checks: append to OS list if not current OS & not more than 2 OS")
             if not self.is_currentos(ltv) and len(dct[d]) < 3:
-                self.log.debug("Appending to OS list: '{0}' in device '{1}'".format(ltv, d))
+                self.log.debug("Appending to OS list: '%s' in device '%s'", ltv, d)
                 li.append(ltv)
             elif not len(dct[d]) < 3:
-                self.log.debug("More than 2 OS found on device: {0} -- will not append '{1}' to OS list".format(d, ltv))
+                self.log.debug("More than 2 OS found on device: %s -- will not append '%s' to OS list", d, ltv)
                 self.morethan2.add(d)
-            self.log.debug("Current OS list: {0}\nCurrent device {1} dict: {2}\nCurrent 'more than 2 kernels' list: {3}\n".format(li, d, dct[d], self.morethan2))
+            # Sizes only, the whole lists would make debug logging quadratic
+            self.log.debug("Current OS list: %d OS, device %s: %d OS, 'more than 2 kernels' devices: %d\n",
+                len(li), d, len(dct[d]), len(self.morethan2))
 
         self.oslist = li
         self.osdict = dct
-        self.log.debug("Final OS list: {0}\nFinal OS dict: {1}\nFinal 'more than 2 kernels' list: {2}\n".format(self.oslist, self.osdict, self.morethan2))
+        self.log.debug("Final OS list: %s\nFinal OS dict: %s\nFinal 'more than 2 kernels' list: %s\n", self.oslist, self.osdict, self.morethan2)
         if self.morethan2:
             mt2 = ' '.join(self.morethan2)
-            self.log.warning("More than 2 OS found on device(s): {0}".format(mt2))
+            self.log.warning("More than 2 OS found on device(s): %s", mt2)
         return True
 
     def is_currentos(self, osline):
         """ Detect current os (based on linux version) in self.oslist
             Returns True/False
         """
-        un = platform.uname()
-        #('Linux', 'home-desktop', '2.6.38-8-generic', '#42-Ubuntu SMP Mon Apr 11 03:31:24 UTC 2011', 'x86_64', 'x86_64')
-        if not un[0] == "Linux":
-            return False
-        currlinver = un[2].replace('.', '\.') #escape dots (regex)
-        if re.search(currlinver, osline):
+        if self.rules.iscurrent(osline):
             # If current linux version is found in a grub os line
-            self.log.debug("Matches current OS: '{0}'".format(osline))
+            self.log.debug("Matches current OS: '%s'", osline)
             return True
         return False
 
     def is_wubi(self):
         # Detects wubi installation
-        # Scans /etc/fstab for loop devices as root "/" and swap
+        # Looks up loop devices as root "/" and swap in /etc/fstab
         #return True # Uncomment this for testing
-        fstabfile = "/etc/fstab" # /etc/fstab
-        if not os.path.isfile(fstabfile):
-            return False
-        with open(fstabfile, "r") as f:
-            a = list(f.readlines())
-        lines = ''.join(a)
-        f.close()
-        #print(lines)
-        matches = re.findall("^([^#][^\s]+)\s+([^\s]+)\s+([^\s]+)\s+([^\s]+)", lines, re.M)
-        #Returns: [('proc', '/proc', 'proc', 'nodev,noexec,nosuid'),
-        #('/host/ubuntu/disks/root.disk', '/', 'ext4', 'loop,errors=remount-ro'),
-        #('/host/ubuntu/disks/swap.disk', 'none', 'swap', 'loop,sw')]
-
-        # Wubi uses a feature called "loop device" to load its root/swap files.
-        root_looped = False
-        swap_looped = False
-        for dev,mpoint,part,opts in matches:
-            if mpoint == "/" and re.match("loop", opts):
-                root_looped = True
-            if part == "swap" and re.match("loop", opts):
-                swap_looped = True
-        if root_looped and swap_looped:
+        if self.mounts.iswubi():
             self.log.warning("wubi installation detected.\n")
             return True
-        else:
-            return False
+        return False
 
-def main():
-    global args, log
-    o = osgrubber(logger=log).returnall()
-    #(osinfo, arch_type, iswubi, lang, self.oslist, self.osdict, self.morethan2)
-    log.debug("core(o).returnall()")
-    text = core(o, logger=log).returnall()
-    if args.text_only:
-        log.debug("Console-only output")
-        print(text)
-    else:
-        log.debug("Console and gui output")
-        print(text)
-        siggui(text, osgrubber=o, logger=log, debug=args.debug)
-        Gtk.main()
+def collect(usecache=True, logger=None, cache=None, root=None):
+    """ Probes the system and returns a signature (see above).
+        Every call probes again (or uses the probe cache if usecache is
+        True), calls from several threads do not share state.
+        cache: a probecache kept by the caller (e.g. signaturedaemon)
+        root: a sysroot or the path of a captured system (directory or
+        archive), probed without the cache (its fingerprints are of this
+        system)
+    """
+    logger = logger or log
+    root = sysroot.openroot(root)
+    if not root.live:
+        usecache = False
+        cache = None
+    # osgrubber and core probes run concurrently
+    scheduler = probescheduler(logger=logger)
+    if cache is None:
+        cache = probecache(logger=logger, enabled=usecache)
+    scheduler.add("osgrubber", cache.wrap("osgrubber",
+        lambda: osgrubber(logger=logger, mounts=mounttable(root=root), root=root).returnall()))
+    c = core(None, logger=logger, scheduler=scheduler, cache=cache, root=root)
+    scheduler.run()
+    cache.save()
+    o = scheduler.results["osgrubber"] # records.hostfacts
+    c.osgrubbertuple = o
+    logger.debug("core(o).returnall()")
+    return signature(
+        knowledge=c.dicreplace(c.knowledge()),
+        osinfo=c.dicreplace(c.osinfo()),
+        specs=c.dicreplace(c.specs()),
+        osgrubber=o,
+        info=hostinfo(*c.info),
+        timings=dict(scheduler.timings),
+    )
+
+def render(s):
+    """ Returns the text of a signature from collect() """
+    return "{0}\n{1}\n{2}".format(s.knowledge, s.osinfo, s.specs)
+
+def servesignature(path=None):
+    """ Runs a signaturedaemon until interrupted """
+    import signaturedaemon
+    path = path or signaturedaemon.socketpath()
+    d = signaturedaemon.signaturedaemon(path, collect, render, logger=log)
+    log.info("Serving the signature on %s", path)
+    try:
+        d.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        d.server_close()
+
+def watchsignature(usecache=True):
+    """ Prints the signature, then its changes, until interrupted """
+    import json
+    from probewatcher import probewatcher
+    def printdiff(diff, s):
+        print(json.dumps(dict((k, {"old": a, "new": b}) for (k, (a, b)) in diff.items()),
+            sort_keys=True))
+        sys.stdout.flush()
+    cache = probecache(logger=log, enabled=usecache)
+    w = probewatcher(collect, logger=log, cache=cache)
+    print(render(w.signature))
+    sys.stdout.flush()
+    w.subscribe(printdiff)
+    w.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        w.stop()
+
+def main(argv=None):
+    if pyversion < '2.7':
+        exit('ERROR: You need python 2.7 or higher to use this program.')
+    if osfacts.system() != "Linux":
+        exit('ERROR: This script is built for GNU/Linux platforms (for now)')
+    args = parsearguments(argv)
+    setuplogging(args.debug, args.log_file)
+    log.debug("parsing arguments: %s", args)
+    try:
+        if args.daemon is not None:
+            servesignature(args.daemon)
+            return
+        if args.watch:
+            watchsignature(usecache=not args.no_cache)
+            return
+        if args.capture:
+            import snapshot
+            (s, size) = snapshot.capture(args.capture, logger=log,
+                inner=sysroot.openroot(args.root))
+            print(render(s))
+            log.info("Snapshot written to %s (%d bytes)", args.capture, size)
+            return
+        if not args.text_only and not loadgui():
+            args.text_only = True
+        s = collect(usecache=not args.no_cache, root=args.root)
+        text = render(s)
+        if args.text_only:
+            log.debug("Console-only output")
+            print(text)
+        else:
+            log.debug("Console and gui output")
+            print(text)
+            siggui(text, osgrubber=s.osgrubber, logger=log, debug=args.debug)
+            Gtk.main()
+    finally:
+        # Writes the queued log records
+        pipeline.stop()
     logging.shutdown()
 
-def timeit():
-    f = 'core(osgrubber().returnall()).returnall()'
-    import cProfile
-    cProfile.run(f)
-    import timeit
-    t = timeit.Timer(f, 'from __main__ import osgrubber, core')
-    print(t.timeit(number=100))
+# Benchmarks of the stages: bench/stages.py
 
 if __name__ == "__main__":
     main()
-    #timeit()
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+# File: grubparser.py
+# Purpose: Single-pass, line-oriented parser of grub2 grub.cfg menu entries
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Example of grub.cfg:
+menuentry 'Ubuntu' --class ubuntu $menuentry_id_option 'gnulinux-simple-9d1c' {
+	set root='hd0,msdos1'
+	linux	/boot/vmlinuz-3.2.0-29-generic root=UUID=9d1c ro quiet splash
+}
+submenu 'Advanced options for Ubuntu' {
+	menuentry 'Ubuntu, with Linux 3.2.0-29-generic' {
+		set root='hd0,msdos1'
+		linux	/boot/vmlinuz-3.2.0-29-generic root=UUID=9d1c ro
+	}
+}
+    parseentries() yields, in file order:
+{'title': 'Ubuntu', 'device': 'hd0,msdos1', 'submenu': [], 'chainloader': False, 'loader': None,
+ 'linuxstr': '/boot/vmlinuz-3.2.0-29-generic root=UUID=9d1c ro quiet splash'}
+{'title': 'Ubuntu, with Linux 3.2.0-29-generic', 'device': 'hd0,msdos1',
+ 'submenu': ['Advanced options for Ubuntu'], 'chainloader': False, 'loader': None,
+ 'linuxstr': '/boot/vmlinuz-3.2.0-29-generic root=UUID=9d1c ro'}
+    Entries of other systems have 'loader', the command of their kernel,
+    e.g. 'kfreebsd' (FreeBSD), 'xnu_kernel64' (Mac OS X) or 'multiboot'
+    (Xen, whose linuxstr is the linux module). Entries booting no system
+    (e.g. "fwsetup" for the UEFI settings) have linuxstr None, chainloader
+    False and loader None.
+    Every line is read once and only the open blocks are kept in memory,
+    so the parser runs in linear time with bounded memory. Lines that are
+    no block and no command of an entry are skipped without splitting
+    them; the common ones ("}", "set root='...'", "menuentry '...' {" and
+    unquoted commands) are split with str.split() or one regular
+    expression, the others with tokenize().
+"""
+
+import re
+
+linuxcommands = ("linux", "linux16", "linuxefi")
+# Kernels of other systems (os-prober entries) and of grub legacy
+loadercommands = ("kfreebsd", "knetbsd", "kopenbsd", "multiboot", "multiboot2",
+    "xen_hypervisor", "xnu_kernel", "xnu_kernel64", "appleloader", "kernel")
+# Modules of a multiboot kernel, the linux kernel of a Xen entry
+modulecommands = ("module", "module2", "xen_module")
+# Commands read inside a menuentry
+entrycommands = ("set", "chainloader") + linuxcommands + loadercommands + modulecommands
+# Separators, quoted strings, ${variables}, braces and plain text
+tokenre = re.compile(r"""(\s+|;)|'([^']*)'?|"((?:[^"\\]|\\.)*)"?|(\$\{[^}]*\}?)|([{}])|([^\s;'"{}$]+|\$)""")
+# Lines with these characters always go through tokenre
+specialchars = re.compile(r'["\\;#]|\$\{')
+# Lines without braces that str.split() cannot split
+quotedline = re.compile(r"['\"\\;#]").search
+# The common quoted lines, read without tokenize(): "set root='hd0,msdos1'"
+# and "menuentry 'Ubuntu' --class ubuntu $menuentry_id_option 'gnulinux-9d1c' {"
+# (a title, then no braces, double quotes, backslashes, ";" or "#")
+setrootline = re.compile(r"set[ \t]+root='([^'\\]*)'$").match
+blockline = re.compile(r"""(menuentry|submenu)[ \t]+'([^']*)'(?:[ \t][^"\\;#{}]*)?(?<![$'])[ \t]*\{$""").match
+# Words of the other lines: single-quoted strings glued to text, or a brace
+wordre = re.compile(r"(?:'[^']*'|[^\s'{}])+|[{}]")
+
+def splitline(line):
+    """ tokenize() of the common lines (no double quotes, backslashes,
+        ";", "#" or "${"), in C: str.split() or one findall().
+        Returns None for other lines.
+    """
+    if specialchars.search(line):
+        return None
+    if not "'" in line:
+        if not "{" in line and not "}" in line:
+            return (line.split(), 0, 0)
+        tokens = words = wordre.findall(line)
+    elif line.count("'") % 2:
+        return None # Unclosed quote
+    else:
+        tokens = wordre.findall(line)
+        words = [t.replace("'", "") if "'" in t else t for t in tokens]
+    return (words, tokens.count("{"), tokens.count("}"))
+
+def tokenize(line):
+    """ Splits a grub.cfg line into words, like the grub shell does.
+        Quotes are removed, "{" and "}" outside quotes and variables are
+        separate words. Variables are not expanded.
+        Returns (words, opened braces, closed braces)
+    """
+    fast = splitline(line)
+    if fast is not None:
+        return fast
+    words = list()
+    word = None # Pieces of the current word, e.g. root= and 'hd0,msdos1'
+    opened = 0
+    closed = 0
+    for m in tokenre.finditer(line):
+        (sep, squote, dquote, var, brace, plain) = m.groups()
+        if sep is not None:
+            if word is not None:
+                words.append("".join(word))
+                word = None
+        elif brace is not None:
+            if word is not None:
+                words.append("".join(word))
+                word = None
+            words.append(brace)
+            if brace == "{":
+                opened += 1
+            else:
+                closed += 1
+        elif plain is not None and word is None and plain[0] == "#":
+            break # Comment
+        else:
+            if word is None:
+                word = list()
+            word.append(next(x for x in (squote, dquote, var, plain) if x is not None))
+    if word is not None:
+        words.append("".join(word))
+    return (words, opened, closed)
+
+def rootdevice(value):
+    # "(hd0,msdos1)" or "hd0,msdos1" => "hd0,msdos1"
+    if value.startswith("(") and value.endswith(")"):
+        return value[1:-1]
+    return value
+
+def parseentries(lines):
+    """ Parses grub.cfg lines (e.g. an open file), yields a dictionary for
+        every menuentry (see the module docstring).
+    """
+    stack = list() # Open blocks: ("submenu", title), ("menuentry", record), ("other", None)
+    entry = None # Innermost open menuentry
+    for line in lines:
+        if "{" in line or "}" in line:
+            line = line.strip()
+            if line == "}":
+                # The most common block line, closes the innermost block
+                if stack:
+                    (kind, value) = stack.pop()
+                    if kind == "menuentry":
+                        yield finishentry(value)
+                        entry = innermost(stack)
+                continue
+            m = blockline(line)
+            if m and not line.count("'") % 2:
+                (words, opened, closed) = ([m.group(1), m.group(2)], 1, 0)
+            else:
+                (words, opened, closed) = tokenize(line)
+        else:
+            # No block opens or closes: only commands of an entry matter,
+            # most lines (insmod, search, if, echo...) are skipped here
+            if entry is None:
+                continue
+            line = line.strip()
+            if not line.startswith(entrycommands):
+                continue
+            if line.startswith("set"):
+                if entry["device"] is not None or not line[3:].lstrip().startswith("root="):
+                    continue
+            elif line.startswith(linuxcommands):
+                if entry["linuxstr"] is not None or entry["chainloader"]:
+                    continue
+            if not quotedline(line):
+                (words, opened, closed) = (line.split(), 0, 0)
+            else:
+                m = setrootline(line)
+                if m:
+                    (words, opened, closed) = (["set", "root=" + m.group(1)], 0, 0)
+                else:
+                    (words, opened, closed) = tokenize(line)
+        if not words:
+            continue
+        command = words[0]
+        if entry is not None:
+            if command == "set" and len(words) > 1 and words[1].startswith("root="):
+                if entry["device"] is None:
+                    entry["device"] = rootdevice(words[1][5:])
+            elif command in linuxcommands and len(words) > 1:
+                if entry["linuxstr"] is None and not entry["chainloader"]:
+                    entry["linuxstr"] = " ".join(words[1:])
+            elif command == "chainloader":
+                entry["chainloader"] = True
+            elif command in loadercommands:
+                if entry["loader"] is None:
+                    entry["loader"] = command
+            elif command in modulecommands and entry["linuxstr"] is None:
+                # module --nounzip /boot/vmlinuz-3.2.0-29-generic placeholder root=...
+                args = [w for w in words[1:] if not w.startswith("--")]
+                if args and "vmlinu" in args[0]:
+                    entry["linuxstr"] = " ".join(args)
+        # Block openings and closings, in the order of the line
+        if command in ("menuentry", "submenu") and opened:
+            title = words[1] if len(words) > 1 and words[1] != "{" else ""
+            if command == "menuentry":
+                record = {
+                    "title": title,
+                    "device": None,
+                    "linuxstr": None,
+                    "chainloader": False,
+                    "loader": None,
+                    "submenu": [v for (k, v) in stack if k == "submenu"],
+                }
+                stack.append(("menuentry", record))
+                entry = record
+            else:
+                stack.append(("submenu", title))
+            opened -= 1
+        for i in range(opened):
+            stack.append(("other", None))
+        for i in range(closed):
+            if not stack:
+                break
+            (kind, value) = stack.pop()
+            if kind == "menuentry":
+                yield finishentry(value)
+        if closed:
+            entry = innermost(stack)
+    # Unclosed entries at the end of the file
+    for (kind, value) in stack:
+        if kind == "menuentry":
+            yield finishentry(value)
+
+def innermost(stack):
+    # The innermost open menuentry, or None
+    for (kind, value) in reversed(stack):
+        if kind == "menuentry":
+            return value
+    return None
+
+def finishentry(record):
+    if record["device"] is None:
+        record["device"] = ""
+    return record
+
+def bootable(record):
+    # True if the entry boots a system (linux, chainloader or another kernel)
+    return record["linuxstr"] is not None or record["chainloader"] or record["loader"] is not None
+
+def readentries(filename):
+    """ Returns the list of menu entries of a grub.cfg file """
+    with open(filename, "r") as f:
+        return list(parseentries(f))
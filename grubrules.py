@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+# File: grubrules.py
+# Purpose: Compiled rules for grub menu entries (blacklist, titles, kernel versions)
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+
+import osfacts
+
+# Linux entries to skip: the "Ubuntu" default entry (duplicate of the
+# first kernel), fallback, recovery and memtest entries
+linuxtitles = ("^Ubuntu$", "Fallback", "ανάκτηση")
+linuxstrings = ("fallback", "recovery", "memtest")
+# Entries to skip whatever they boot, e.g. Windows recovery
+titles = ("Recovery",)
+
+
+def anyof(patterns):
+    return re.compile("|".join("(?:{0})".format(p) for p in patterns))
+
+def currentkernel():
+    # Release of the running linux kernel, e.g. '3.2.0-29-generic', or None
+    if osfacts.system() != "Linux":
+        return None
+    return osfacts.kernel()
+
+
+class grubrules:
+    """ Matchers for grub menu entries, compiled once and then used for
+        every entry of grub.cfg.
+
+        Example:
+            r = grubrules()
+            r.blacklisted("Ubuntu, with Linux 3.2.0-29-generic (recovery mode)",
+                "/boot/vmlinuz-3.2.0-29-generic root=UUID=9d1c ro recovery")
+            True
+            r.title("Ubuntu, with Linux 3.2.0-29-generic")
+            'Ubuntu'
+            r.version("/boot/vmlinuz-3.2.0-29-generic root=UUID=9d1c ro")
+            '3.2.0-29-generic'
+    """
+    def __init__(self, kernel=False):
+        self.linuxtitles = anyof(linuxtitles)
+        self.linuxstrings = anyof(linuxstrings)
+        self.titles = anyof(titles)
+        # Title truncation, in order
+        self.truncate = (
+            (re.compile(r",? [^\s]*? Linux.*"), ""),
+            (re.compile(r"\([^\)]*?\)$|\s*?\(loader\)"), ""),
+            (re.compile(r"\s+"), " "),
+        )
+        self.vmlinuz = re.compile(r".*vmlinuz-([^\s]*)")
+        # kernel=False: the running kernel, None: never the current OS
+        self.kernel = currentkernel() if kernel is False else kernel
+
+    def blacklisted(self, title, linuxstr):
+        """ Returns True for entries that are not listed """
+        if linuxstr is not None and (self.linuxtitles.search(title) or
+                self.linuxstrings.search(linuxstr)):
+            return True
+        return bool(self.titles.search(title))
+
+    def title(self, t):
+        """ Truncates the title of an entry: 'Ubuntu, with Linux 3.2.0-29-generic' => 'Ubuntu' """
+        for (regex, repl) in self.truncate:
+            t = regex.sub(repl, t)
+        return t.rstrip()
+
+    def version(self, linuxstr):
+        """ Returns the kernel version of a linux command line, or "" """
+        if linuxstr is None:
+            return ""
+        m = self.vmlinuz.match(linuxstr)
+        return m.group(1) if m else ""
+
+    def iscurrent(self, osline):
+        """ True if the entry boots the running kernel """
+        return self.kernel is not None and self.kernel in osline
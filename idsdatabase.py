@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+# File: idsdatabase.py
+# Purpose: Indexed, memory-mapped pci.ids/usb.ids name lookups
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The text ids file is converted once to an index file:
+    header | sorted records (key, offset, length) | utf-8 names
+    The index is memory-mapped and searched with a binary search, so only
+    the touched pages are loaded. It is rebuilt when the ids file changes.
+"""
+
+import os
+import os.path
+import re
+import zlib
+import mmap
+import struct
+import threading
+from collections import OrderedDict
+
+magic = b"FSIDSIDX"
+version = 1
+header = struct.Struct("<8sIQQI") # magic, version, source mtime, source size, records
+record = struct.Struct("<QII") # key, name offset, name length
+
+# Record key kinds
+VENDOR = 0
+DEVICE = 1
+CLASS = 2
+SUBCLASS = 3
+
+vendorline = re.compile("^([0-9a-fA-F]{4})\s+(.*)$")
+classline = re.compile("^C ([0-9a-fA-F]{2})\s+(.*)$")
+subline = re.compile("^\t([0-9a-fA-F]{2,4})\s+(.*)$")
+
+
+def makekey(kind, a, b=0):
+    # vendor: (VENDOR, v), device: (DEVICE, v, d)
+    # class: (CLASS, c), subclass: (SUBCLASS, c, s)
+    return (kind << 32) | (a << 16) | b
+
+def cachedirectory():
+    d = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(d, "forum-signature")
+
+def parseids(filename):
+    """ Parses a pci.ids/usb.ids file.
+        Returns a list of (key, name) tuples, see makekey()
+    """
+    entries = list()
+    append = entries.append
+    current = None
+    section = None
+    with open(filename, "rb") as f:
+        for raw in f:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if not line or line[0] == "#":
+                continue
+            if line[0] != "\t":
+                m = vendorline.match(line)
+                if m:
+                    section = DEVICE
+                    current = int(m.group(1), 16)
+                    append((makekey(VENDOR, current), m.group(2)))
+                    continue
+                m = classline.match(line)
+                if m:
+                    section = SUBCLASS
+                    current = int(m.group(1), 16)
+                    append((makekey(CLASS, current), m.group(2)))
+                    continue
+                current = None # Any other section of usb.ids
+                continue
+            if current is None:
+                continue
+            m = subline.match(line)
+            if m:
+                append((makekey(section, current, int(m.group(1), 16)), m.group(2)))
+    return entries
+
+def buildindex(filename):
+    """ Returns the index of an ids file as bytes """
+    st = os.stat(filename)
+    entries = dict(parseids(filename)) # Duplicate keys: last one wins
+    keys = sorted(entries)
+    records = list()
+    strings = list()
+    offset = 0
+    for k in keys:
+        b = entries[k].encode("utf-8")
+        records.append(record.pack(k, offset, len(b)))
+        strings.append(b)
+        offset += len(b)
+    head = header.pack(magic, version, int(st.st_mtime), st.st_size, len(keys))
+    return head + b"".join(records) + b"".join(strings)
+
+def indexvalid(data, filename):
+    # Checks the index header against the ids file
+    if len(data) < header.size:
+        return False
+    (m, v, mtime, size, count) = header.unpack_from(data, 0)
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return False
+    return (m == magic and v == version and mtime == int(st.st_mtime)
+        and size == st.st_size and len(data) >= header.size + count * record.size)
+
+
+class idsdatabase:
+    """ Name lookups in a pci.ids/usb.ids file through a sorted,
+        memory-mapped index and a small LRU cache.
+
+        Example:
+            db = idsdatabase("/usr/share/misc/pci.ids")
+            db.device("10de", "0393") # 'G73 [GeForce 7300 GT]'
+    """
+    def __init__(self, idsfile, cachedir=None, lrusize=512):
+        self.idsfile = idsfile
+        self.cachedir = cachedir or cachedirectory()
+        self.lrusize = lrusize
+        self.lru = OrderedDict()
+        self.lock = threading.Lock()
+        self.data = None # mmap or bytes, loaded on first lookup
+        self.count = 0
+
+    def indexfile(self):
+        # "pci.ids.1c291ca3.idx": the hash of the absolute path keeps the
+        # indexes of ids files with the same name apart
+        path = os.path.abspath(self.idsfile)
+        data = path if isinstance(path, bytes) else path.encode("utf-8") # py2 str is bytes
+        key = zlib.crc32(data) & 0xffffffff
+        name = "{0}.{1:08x}.idx".format(os.path.basename(path), key)
+        return os.path.join(self.cachedir, name)
+
+    def load(self):
+        # Maps the index file, (re)building it if it is missing or stale.
+        # If the cache directory is not writable, the index stays in memory.
+        idx = self.indexfile()
+        data = self.mapindex(idx)
+        if data is None:
+            data = buildindex(self.idsfile)
+            try:
+                if not os.path.isdir(self.cachedir):
+                    os.makedirs(self.cachedir)
+                tmp = "{0}.{1}.tmp".format(idx, os.getpid())
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.rename(tmp, idx)
+                data = self.mapindex(idx) or data
+            except (IOError, OSError):
+                pass
+        self.data = data
+        self.count = header.unpack_from(data, 0)[4]
+
+    def mapindex(self, idx):
+        try:
+            with open(idx, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return None # ValueError: empty file
+        if not indexvalid(data, self.idsfile):
+            data.close()
+            return None
+        return data
+
+    def lookup(self, key):
+        """ Returns the name for a makekey() key, or None """
+        with self.lock:
+            try:
+                name = self.lru.pop(key)
+                self.lru[key] = name # Move to the end (most recent)
+                return name
+            except KeyError:
+                pass
+            if self.data is None:
+                self.load()
+            name = self.search(key)
+            self.lru[key] = name
+            if len(self.lru) > self.lrusize:
+                self.lru.popitem(last=False)
+            return name
+
+    def search(self, key):
+        # Binary search over the fixed-size records
+        data = self.data
+        lo = 0
+        hi = self.count
+        base = header.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            (k, offset, length) = record.unpack_from(data, base + mid * record.size)
+            if k < key:
+                lo = mid + 1
+            elif k > key:
+                hi = mid
+            else:
+                start = base + self.count * record.size + offset
+                return data[start:start + length].decode("utf-8")
+        return None
+
+    def hexlookup(self, kind, a, b="0"):
+        # Lookup by hex strings, invalid or missing ids have no name
+        try:
+            return self.lookup(makekey(kind, int(a, 16), int(b, 16)))
+        except ValueError:
+            return None
+
+    def vendor(self, vendor):
+        return self.hexlookup(VENDOR, vendor)
+
+    def device(self, vendor, device):
+        return self.hexlookup(DEVICE, vendor, device)
+
+    def classname(self, cls):
+        return self.hexlookup(CLASS, cls)
+
+    def subclass(self, cls, sub):
+        return self.hexlookup(SUBCLASS, cls, sub)
+
+databases = dict() # ids file: idsdatabase, shared by the whole process
+databaseslock = threading.Lock()
+
+def getdatabase(idsfile):
+    """ Returns the shared idsdatabase of an ids file, or None """
+    if not idsfile:
+        return None
+    with databaseslock:
+        db = databases.get(idsfile)
+        if db is None:
+            db = databases[idsfile] = idsdatabase(idsfile)
+        return db
@@ -1,25 +1,21 @@
 #!/usr/bin/python
-import platform
-import subprocess
+import sys
 
-if platform.python_version() < '2.5':
+if sys.version_info < (2, 5):
     exit('ERROR: You need python 2.5 or higher to use this program.')
-if platform.system() != "Linux":
+if not sys.platform.startswith("linux"):
     exit('ERROR: This script is built for GNU/Linux platforms (for now)')
 
-gtk3 = True
-try:
-    from gi.repository import Gtk, Gdk
-except ImportError:
-    print("Could not load gtk3 module. Using old gtk2.\n")
-    gtk3 = False
+# Importing the gtk3 frontend does not load gtk, it is only loaded by
+# main() for the gui
+import forum_signature_gtk3
 
-if gtk3:
-    # Start gtk3
-    import forum_signature_gtk3
+args = forum_signature_gtk3.parsearguments()
+if args.text_only or forum_signature_gtk3.guiavailable():
+    # Start gtk3 (or text-only output)
     forum_signature_gtk3.main()
 else:
     # Start gtk2
+    print("Could not load gtk3 module. Using old gtk2.\n")
     import forum_signature
     forum_signature.main()
-
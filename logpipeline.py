@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# File: logpipeline.py
+# Purpose: Log handlers running on a background thread, with a size-capped log file
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" The logger only puts records on a queue; a listener thread writes them
+    to the log file and to stdout, so slow writes do not block the probes or
+    the gtk main loop. Messages are merged with their %-style arguments
+    when the record is queued, only for enabled levels:
+        log.debug("Found linux version: '%s' from '%s'", v, l)
+"""
+
+import os
+import sys
+import logging
+import logging.handlers
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue # python2
+
+defaultformat = '%(levelname)s: %(message)s'
+
+try:
+    from logging.handlers import QueueHandler as queuehandler
+    from logging.handlers import QueueListener
+
+    def queuelistener(q, *handlers):
+        return QueueListener(q, *handlers, respect_handler_level=True)
+except ImportError:
+    # python2 fallback of QueueHandler and QueueListener (python 3.2)
+    class queuehandler(logging.Handler):
+        """ Puts records on a queue, with their message already merged with
+            the arguments (they may change before the listener writes them)
+        """
+        def __init__(self, q):
+            logging.Handler.__init__(self)
+            self.queue = q
+
+        def emit(self, record):
+            try:
+                record.msg = self.format(record)
+                record.args = None
+                record.exc_info = None
+                record.exc_text = None
+                self.queue.put_nowait(record)
+            except Exception:
+                self.handleError(record)
+
+    class queuelistener:
+        """ Passes the records of a queue to handlers, on a thread """
+        sentinel = None
+
+        def __init__(self, q, *handlers):
+            self.queue = q
+            self.handlers = handlers
+            self.thread = None
+
+        def start(self):
+            self.thread = threading.Thread(target=self.monitor)
+            self.thread.daemon = True
+            self.thread.start()
+
+        def monitor(self):
+            while True:
+                record = self.queue.get()
+                if record is self.sentinel:
+                    break
+                for h in self.handlers:
+                    if record.levelno >= h.level:
+                        h.handle(record)
+
+        def stop(self):
+            self.queue.put_nowait(self.sentinel)
+            self.thread.join()
+            self.thread = None
+
+
+def filehandler(filename, maxbytes, backups):
+    """ Returns a handler writing to filename, rotated at maxbytes.
+        An existing log is rotated first, each run starts a new file and
+        the last runs are kept as filename.1 ... filename.<backups>.
+    """
+    d = os.path.dirname(filename)
+    if d and not os.path.isdir(d):
+        os.makedirs(d)
+    h = logging.handlers.RotatingFileHandler(filename, maxBytes=maxbytes,
+        backupCount=backups, delay=True)
+    if os.path.isfile(filename) and os.path.getsize(filename) > 0:
+        h.doRollover()
+    return h
+
+
+class logpipeline:
+    """ Attaches a queuehandler to a logger and writes its records from a
+        queuelistener thread.
+
+        Example:
+            p = logpipeline(log, filename="/tmp/forum-signature.log")
+            p.start()
+            log.debug("Probe '%s' finished in %.3fs", name, seconds)
+            p.stop() # Writes the queued records
+    """
+    def __init__(self, logger, filename=None, maxbytes=1048576, backups=3,
+            stream=sys.stdout, fmt=defaultformat):
+        self.log = logger
+        formatter = logging.Formatter(fmt)
+        self.handlers = list()
+        if filename:
+            try:
+                self.handlers.append(filehandler(filename, maxbytes, backups))
+            except (IOError, OSError) as e:
+                sys.stderr.write("Could not open the log file {0}: {1}\n".format(filename, e))
+        if stream is not None:
+            self.handlers.append(logging.StreamHandler(stream))
+        for h in self.handlers:
+            h.setFormatter(formatter)
+        self.queue = queue.Queue()
+        self.queuehandler = queuehandler(self.queue)
+        self.listener = None
+
+    def start(self):
+        self.log.addHandler(self.queuehandler)
+        self.listener = queuelistener(self.queue, *self.handlers)
+        self.listener.start()
+
+    def stop(self):
+        """ Detaches from the logger, waits for the queued records to be
+            written and closes the handlers
+        """
+        if self.listener is None:
+            return
+        self.log.removeHandler(self.queuehandler)
+        self.listener.stop()
+        self.listener = None
+        for h in self.handlers:
+            h.flush()
+            if isinstance(h, logging.FileHandler):
+                h.close()
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# File: mounttable.py
+# Purpose: Index of /etc/fstab and /proc/self/mountinfo by mountpoint and filesystem type
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Example of /etc/fstab of a wubi installation:
+/host/ubuntu/disks/root.disk / ext4 loop,errors=remount-ro 0 1
+/host/ubuntu/disks/swap.disk none swap loop,sw 0 0
+    Example of /proc/self/mountinfo (fields after "-": type, source, options):
+36 35 98:0 /mnt1 /mnt2 rw,noatime master:1 - ext3 /dev/root rw,errors=continue
+"""
+
+import re
+import threading
+
+from sysroot import live
+
+fstabfile = "/etc/fstab"
+mountinfofile = "/proc/self/mountinfo"
+
+
+octalescape = re.compile(r"\\([0-7]{3})")
+
+def unescape(field):
+    # Spaces, tabs etc. are written as octal escapes: "/media/My\040Disk"
+    if not "\\" in field:
+        return field
+    return octalescape.sub(lambda m: chr(int(m.group(1), 8)), field)
+
+def parsefstab(lines):
+    """ Yields dictionaries {'source', 'mountpoint', 'fstype', 'options'}
+        from fstab lines, options is a list
+    """
+    for line in lines:
+        fields = line.split()
+        if len(fields) < 3 or fields[0].startswith("#"):
+            continue
+        options = fields[3].split(",") if len(fields) > 3 else ["defaults"]
+        yield {
+            "source": unescape(fields[0]),
+            "mountpoint": unescape(fields[1]),
+            "fstype": fields[2],
+            "options": options,
+        }
+
+def redactfstab(text):
+    """ fstab text without comments and without the options that have a
+        value (credentials=, username=, password=...): the source,
+        mountpoint, type and flags like "loop" that iswubi() reads
+    """
+    lines = list()
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 3 or fields[0].startswith("#"):
+            continue
+        flags = [o for o in fields[3].split(",") if not "=" in o] if len(fields) > 3 else []
+        lines.append(" ".join(fields[:3] + [",".join(flags or ["defaults"])]) + "\n")
+    return "".join(lines)
+
+def parsemountinfo(lines):
+    """ Yields dictionaries {'source', 'mountpoint', 'fstype', 'options', 'root'}
+        from mountinfo lines, options are the mount and superblock options
+    """
+    for line in lines:
+        fields = line.split()
+        try:
+            sep = fields.index("-", 6)
+            yield {
+                "source": unescape(fields[sep + 2]),
+                "mountpoint": unescape(fields[4]),
+                "fstype": fields[sep + 1],
+                "options": fields[5].split(",") + fields[sep + 3].split(","),
+                "root": unescape(fields[3]),
+            }
+        except (ValueError, IndexError):
+            continue
+
+
+class mountindex:
+    """ Mount entries indexed by mountpoint and by filesystem type.
+        For a mountpoint listed more than once, the last entry is kept
+        (the one that is visible).
+    """
+    def __init__(self, entries):
+        self.bymountpoint = dict()
+        self.bytype = dict()
+        for e in entries:
+            self.bymountpoint[e["mountpoint"]] = e
+            self.bytype.setdefault(e["fstype"], list()).append(e)
+
+    def __len__(self):
+        return len(self.bymountpoint)
+
+    def mountpoint(self, mountpoint):
+        """ Returns the entry of a mountpoint, or None """
+        return self.bymountpoint.get(mountpoint)
+
+    def fstype(self, fstype):
+        """ Returns the list of entries of a filesystem type """
+        return self.bytype.get(fstype, [])
+
+
+class mounttable:
+    """ Configured (fstab) and current (mountinfo) mounts, each file read
+        in one pass when first used.
+
+        Example:
+            m = getmounttable()
+            m.fstab.mountpoint("/")
+            {'source': '/host/ubuntu/disks/root.disk', 'mountpoint': '/', 'fstype': 'ext4',
+             'options': ['loop', 'errors=remount-ro']}
+            m.mounted.fstype("swap")
+            []
+    """
+    def __init__(self, fstab=fstabfile, mountinfo=mountinfofile, root=live):
+        self.root = root
+        self.fstabfile = fstab
+        self.mountinfofile = mountinfo
+        self.lock = threading.Lock()
+        self.indexes = dict()
+
+    def index(self, name):
+        with self.lock:
+            if not name in self.indexes:
+                self.indexes[name] = self.read(name)
+            return self.indexes[name]
+
+    def read(self, name):
+        if name == "fstab":
+            try:
+                with self.root.open(self.fstabfile) as f:
+                    return mountindex(parsefstab(f))
+            except IOError:
+                return mountindex([])
+        try:
+            text = self.root.read(self.mountinfofile)
+        except IOError:
+            text = ""
+        return mountindex(parsemountinfo(text.splitlines()))
+
+    @property
+    def fstab(self):
+        return self.index("fstab")
+
+    @property
+    def mounted(self):
+        return self.index("mountinfo")
+
+    def iswubi(self):
+        """ Wubi installs root and swap as files on a Windows partition,
+            mounted through loop devices (see the module docstring)
+        """
+        fstab = self.fstab
+        root = fstab.mountpoint("/")
+        if root is None or not "loop" in root["options"]:
+            return False
+        return any("loop" in e["options"] for e in fstab.fstype("swap"))
+
+tables = dict() # (fstab, mountinfo): mounttable, shared by the whole process
+tableslock = threading.Lock()
+
+def getmounttable(fstab=fstabfile, mountinfo=mountinfofile):
+    """ Returns the shared mounttable of the files """
+    with tableslock:
+        t = tables.get((fstab, mountinfo))
+        if t is None:
+            t = tables[(fstab, mountinfo)] = mounttable(fstab, mountinfo)
+        return t
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# File: osfacts.py
+# Purpose: Distribution, kernel and architecture of the running system
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Replaces platform.linux_distribution() (removed in python 3.8) and
+    platform.architecture() (may run "file" on the python binary).
+    Every fact of the running system is computed once per process (until
+    forget()); facts of a captured sysroot (see sysroot.py) are read on
+    every call:
+        osinfo(sysroot.openroot("captures/host1.tar"))
+
+    Example of /etc/os-release:
+NAME="Ubuntu"
+VERSION="12.04.1 LTS, Precise Pangolin"
+ID=ubuntu
+VERSION_ID="12.04"
+    Example of /etc/lsb-release:
+DISTRIB_ID=Ubuntu
+DISTRIB_RELEASE=12.04
+DISTRIB_CODENAME=precise
+"""
+
+import os
+import struct
+import threading
+
+osreleasefiles = ("/etc/os-release", "/usr/lib/os-release")
+lsbreleasefile = "/etc/lsb-release"
+
+facts = dict()
+factslock = threading.Lock()
+
+
+def once(func):
+    # Computes func() on the first call, returns the same value afterwards
+    def wrapper(root=None):
+        if root is not None and not root.live:
+            return func(root)
+        try:
+            return facts[func.__name__]
+        except KeyError:
+            pass
+        with factslock:
+            if not func.__name__ in facts:
+                facts[func.__name__] = func(None)
+            return facts[func.__name__]
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+def forget(*names):
+    """ Computes the facts 'names' (e.g. "distribution") again on their
+        next call, for long-lived processes whose files changed
+    """
+    with factslock:
+        for name in names:
+            facts.pop(name, None)
+
+def parserelease(filename, root=None):
+    """ Parses KEY=value lines of an os-release/lsb-release file.
+        Returns dictionary, empty if the file cannot be read.
+    """
+    d = dict()
+    try:
+        with (root.open(filename) if root else open(filename, "r")) as f:
+            for line in f:
+                (key, sep, value) = line.strip().partition("=")
+                if not sep or key.startswith("#"):
+                    continue
+                value = value.strip()
+                quote = value[:1]
+                if len(value) > 1 and quote in "\"'" and value[-1] == quote:
+                    value = value[1:-1]
+                    if quote == '"':
+                        for c in '\\"$`':
+                            value = value.replace("\\" + c, c)
+                d[key.strip()] = value
+    except IOError:
+        pass
+    return d
+
+@once
+def uname(root):
+    # (sysname, nodename, release, version, machine)
+    return tuple(root.uname() if root else os.uname())
+
+def system(root=None):
+    return uname(root)[0]
+
+def kernel(root=None):
+    # e.g. '3.2.0-29-generic'
+    return uname(root)[2]
+
+# Kernel release suffixes naming the machine, e.g. Debian's '6.1.0-13-amd64',
+# Fedora's '6.5.6-300.fc39.x86_64'
+releasemachines = (("amd64", "x86_64"), ("x86_64", "x86_64"), ("arm64", "aarch64"),
+    ("aarch64", "aarch64"), ("686", "i686"), ("686-pae", "i686"), ("armmp", "armv7l"))
+
+@once
+def architecture(root):
+    """ '64bit' or '32bit', the size of a pointer of this python, like
+        platform.architecture()[0]. For a captured sysroot, from the
+        machine of uname, or else from the suffix of the kernel release.
+        "" if unknown: the signature leaves the architecture out rather
+        than guess it from this machine.
+    """
+    if root:
+        machine = uname(root)[4]
+        if not machine:
+            release = kernel(root)
+            machine = next((m for (suffix, m) in releasemachines if release.endswith(suffix)), "")
+        if not machine:
+            return ""
+        return "64bit" if "64" in machine or machine == "s390x" else "32bit"
+    return "{0}bit".format(struct.calcsize("P") * 8)
+
+@once
+def distribution(root):
+    """ Returns tuple (name, version, codename), e.g. ('Ubuntu', '12.04', 'precise'),
+        empty strings for unknown values
+    """
+    for filename in osreleasefiles:
+        d = parserelease(filename, root)
+        if d:
+            codename = d.get("VERSION_CODENAME") or d.get("UBUNTU_CODENAME", "")
+            return (d.get("NAME", ""), d.get("VERSION_ID", ""), codename)
+    d = parserelease(lsbreleasefile, root)
+    return (d.get("DISTRIB_ID", ""), d.get("DISTRIB_RELEASE", ""),
+        d.get("DISTRIB_CODENAME", ""))
+
+def osinfo(root=None):
+    # 'Ubuntu 12.04 precise 3.2.0-29-generic'
+    return " ".join(x for x in distribution(root) + (kernel(root),) if x)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+# File: probecache.py
+# Purpose: On-disk cache of probe results, checked against cheap fingerprints
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Example of cache file (~/.cache/forum-signature/probes.json):
+{"version": 2, "entries": {
+    "cpu": {"fingerprint": {"boot": "4b1c..."}, "value": "Intel Core2 Duo CPU E6550 2.33GHz"},
+    "lspci": {"fingerprint": {"boot": "4b1c...", "pci": "0000:00:00.0 ..."}, "value": "..."}
+}}
+    The cache saves the probes, about half of a collect() (e.g. 2.6ms
+    cold, 1.2ms warm, see bench/stages.py). That gain is seen by the
+    processes that collect several times (watcher, daemon, GUI refresh).
+    A new "-t" process spends most of its time on imports and the log
+    setup, so a warm start costs about the same as a cold one.
+"""
+
+import os
+import os.path
+import json
+import threading
+
+from idsdatabase import cachedirectory
+import sysfsdevices
+import osfacts
+from records import encode, decode
+
+cacheversion = 2
+
+
+def statfingerprint(filename):
+    # "mtime size" of a file, or "" if it does not exist
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return ""
+    return "{0} {1}".format(st.st_mtime, st.st_size)
+
+def listfingerprint(directory):
+    # Sorted entries of a directory, or "" if it does not exist
+    try:
+        return " ".join(sorted(os.listdir(directory)))
+    except OSError:
+        return ""
+
+def readfingerprint(filename):
+    # Contents of a small file, or "" if it does not exist
+    try:
+        with open(filename, "r") as f:
+            return f.read().strip()
+    except IOError:
+        return ""
+
+def driverfingerprint():
+    # "slot=driver" of each PCI device: a driver can be bound, unbound or
+    # replaced (nouveau => nvidia) without a reboot or a new device
+    try:
+        slots = sorted(os.listdir(sysfsdevices.pcidir))
+    except OSError:
+        return ""
+    return " ".join("{0}={1}".format(slot, sysfsdevices.driverlink(
+        os.path.join(sysfsdevices.pcidir, slot))) for slot in slots)
+
+def bootfingerprint():
+    # Changes on every boot (new kernel, new memory, new cpu)
+    return readfingerprint("/proc/sys/kernel/random/boot_id")
+
+def envfingerprint():
+    names = ['LANG', 'XDG_CURRENT_DESKTOP', 'DESKTOP_SESSION', 'GDMSESSION']
+    return " ".join(os.getenv(n, "") for n in names)
+
+# Fingerprint name: function
+fingerprints = {
+    "boot": bootfingerprint,
+    "env": envfingerprint,
+    "grub": lambda: statfingerprint("/boot/grub/grub.cfg"),
+    "fstab": lambda: statfingerprint("/etc/fstab"),
+    "osrelease": lambda: statfingerprint("/etc/os-release"),
+    "pci": lambda: listfingerprint(sysfsdevices.pcidir),
+    "drivers": driverfingerprint,
+    "usb": lambda: listfingerprint(sysfsdevices.usbdir),
+    "net": lambda: listfingerprint("/sys/class/net"),
+    "cpus": lambda: readfingerprint("/sys/devices/system/cpu/online"),
+    "pciids": lambda: statfingerprint(sysfsdevices.findids(sysfsdevices.pciids_files) or ""),
+    "usbids": lambda: statfingerprint(sysfsdevices.findids(sysfsdevices.usbids_files) or ""),
+}
+
+# Fingerprint name: facts of osfacts (computed once per process) read from it
+factinputs = {
+    "osrelease": ("distribution",),
+}
+
+def forgetfacts(names):
+    """ Forgets the osfacts facts of the changed inputs 'names', so the
+        next probes read them again (see probewatcher, signaturedaemon)
+    """
+    osfacts.forget(*[f for n in names for f in factinputs.get(n, ())])
+
+# Probe name: fingerprints its result depends on
+probeinputs = {
+    "lspci": ("boot", "pci", "pciids"),
+    "lsusb": ("boot", "usb", "usbids"),
+    "moduledrivers": ("boot", "pci", "drivers"),
+    "memory": ("boot",),
+    "cpu": ("boot", "cpus"),
+    "display": ("boot", "pci", "drivers", "pciids"),
+    "network": ("boot", "pci", "drivers", "usb", "net", "pciids", "usbids"),
+    "core": ("boot",),
+    "osgrubber": ("boot", "env", "grub", "fstab", "osrelease"),
+}
+
+
+class probecache:
+    """ Persistent cache of probe results.
+        Each entry is stored with the fingerprints of its inputs
+        (see probeinputs) and is only used while they are unchanged.
+
+        Example:
+            cache = probecache(logger=log)
+            scheduler.add("cpu", cache.wrap("cpu", c.getcpuinfo))
+            scheduler.run()
+            cache.save()
+    """
+    def __init__(self, logger, filename=None, enabled=True):
+        self.log = logger
+        self.filename = filename or os.path.join(cachedirectory(), "probes.json")
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.current = dict() # Fingerprints computed in this run
+        self.entries = dict()
+        self.changed = False
+        if enabled:
+            self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, "r") as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == cacheversion:
+            self.entries = data.get("entries", dict())
+
+    def save(self):
+        if not self.enabled or not self.changed:
+            return
+        data = {"version": cacheversion, "entries": self.entries}
+        # Unique per process and thread, collect() may run in several threads
+        tmp = "{0}.{1}.{2}.tmp".format(self.filename, os.getpid(),
+            threading.current_thread().ident)
+        try:
+            d = os.path.dirname(self.filename)
+            if not os.path.isdir(d):
+                os.makedirs(d)
+            with open(tmp, "w") as f:
+                json.dump(data, f)
+            os.rename(tmp, self.filename)
+            self.changed = False
+        except (IOError, OSError) as e:
+            self.log.debug("Could not save probe cache: %s", e)
+
+    def fingerprint(self, name):
+        # Fingerprints of a probe's inputs, each computed once per run
+        fp = dict()
+        for i in probeinputs.get(name, ()):
+            with self.lock:
+                if not i in self.current:
+                    self.current[i] = fingerprints[i]()
+                fp[i] = self.current[i]
+        return fp
+
+    def refresh(self):
+        """ Forgets the fingerprints of this run, the next get() checks the
+            inputs again (for long-lived caches, see signaturedaemon)
+        """
+        with self.lock:
+            self.current = dict()
+
+    def inputs(self):
+        """ Returns dictionary {fingerprint name: value} of all probe inputs """
+        names = set()
+        for i in probeinputs.values():
+            names.update(i)
+        fp = dict()
+        for i in sorted(names):
+            with self.lock:
+                if not i in self.current:
+                    self.current[i] = fingerprints[i]()
+                fp[i] = self.current[i]
+        return fp
+
+    def get(self, name):
+        """ Returns (True, value) for a valid entry, (False, None) otherwise """
+        if not self.enabled or not name in probeinputs:
+            return (False, None)
+        entry = self.entries.get(name)
+        if entry and entry.get("fingerprint") == self.fingerprint(name):
+            return (True, decode(entry["value"]))
+        return (False, None)
+
+    def put(self, name, value):
+        if not self.enabled or not name in probeinputs:
+            return
+        entry = {"fingerprint": self.fingerprint(name), "value": encode(value)}
+        with self.lock:
+            self.entries[name] = entry
+            self.changed = True
+
+    def wrap(self, name, func, store=None):
+        """ Returns a probe function that uses the cached value of 'name'
+            if its inputs did not change, and calls func() otherwise.
+            store(value) is called with the value in both cases.
+        """
+        def probe():
+            (hit, value) = self.get(name)
+            if hit:
+                self.log.debug("Probe '%s': cached", name)
+            else:
+                value = func()
+                self.put(name, value)
+            if store:
+                store(value)
+            return value
+        return probe
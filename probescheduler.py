@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+# File: probescheduler.py
+# Purpose: Runs independent hardware/software probes concurrently
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import sys
+import threading
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue # python2
+
+
+class probescheduler:
+    """ Runs probes on a thread pool, respecting their dependencies.
+        A probe starts as soon as all the probes it depends on have finished,
+        so slow command spawns overlap with file reads.
+
+        Example:
+            s = probescheduler(logger=log)
+            s.add("lspci", c.getlspci)
+            s.add("display", c.getdisplayinfo, deps=("lspci",))
+            results = s.run() # {'lspci': ..., 'display': ...}
+    """
+    def __init__(self, logger, workers=6):
+        self.log = logger
+        self.workers = workers
+        self.probes = dict() # name: (function, deps)
+        self.order = list() # Insertion order, used as start order
+        self.results = dict()
+        self.timings = dict() # name: seconds
+
+    def add(self, name, func, deps=()):
+        if name in self.probes:
+            raise ValueError("Probe already added: {0}".format(name))
+        self.probes[name] = (func, tuple(deps))
+        self.order.append(name)
+
+    def check(self):
+        # Unknown dependencies and cycles would leave run() waiting forever
+        for name in self.order:
+            for dep in self.probes[name][1]:
+                if not dep in self.probes:
+                    raise ValueError("Probe '{0}' depends on unknown probe '{1}'".format(name, dep))
+        state = dict() # name: 1 (visiting) or 2 (done)
+        def visit(name, path):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError("Probe dependency cycle: {0}".format(' -> '.join(path + [name])))
+            state[name] = 1
+            for dep in self.probes[name][1]:
+                visit(dep, path + [name])
+            state[name] = 2
+        for name in self.order:
+            visit(name, [])
+
+    def run(self):
+        """ Runs all added probes and returns a dictionary of their results.
+            If a probe raises, probes depending on it are skipped and the
+            first exception is raised again once everything else finished.
+        """
+        self.check()
+        waiting = dict((n, set(self.probes[n][1])) for n in self.order)
+        dependents = dict((n, list()) for n in self.order)
+        for name in self.order:
+            for dep in self.probes[name][1]:
+                dependents[dep].append(name)
+        ready = queue.Queue()
+        finished = queue.Queue()
+        errors = list()
+
+        def worker():
+            while True:
+                name = ready.get()
+                if name is None:
+                    return
+                func = self.probes[name][0]
+                start = time.time()
+                try:
+                    value = func()
+                    exc = None
+                except Exception:
+                    value = None
+                    exc = sys.exc_info()
+                self.timings[name] = time.time() - start
+                finished.put((name, value, exc))
+
+        threads = list()
+        for i in range(min(self.workers, len(self.order)) or 1):
+            t = threading.Thread(target=worker, name="probe-{0}".format(i))
+            t.daemon = True
+            t.start()
+            threads.append(t)
+
+        for name in self.order:
+            if not waiting[name]:
+                ready.put(name)
+        remaining = len(self.order)
+        skipped = set()
+        while remaining:
+            name, value, exc = finished.get()
+            remaining -= 1
+            if exc:
+                self.log.error("Probe '%s' failed: %s", name, exc[1])
+                errors.append(exc)
+                # Skip everything depending on the failed probe
+                stack = list(dependents[name])
+                while stack:
+                    d = stack.pop()
+                    if not d in skipped:
+                        skipped.add(d)
+                        remaining -= 1
+                        self.log.debug("Skipping probe '%s' (depends on '%s')", d, name)
+                        stack.extend(dependents[d])
+                continue
+            self.results[name] = value
+            self.log.debug("Probe '%s' finished in %.3fs", name, self.timings[name])
+            for d in dependents[name]:
+                waiting[d].discard(name)
+                if not waiting[d] and not d in skipped:
+                    ready.put(d)
+
+        for t in threads:
+            ready.put(None)
+        for t in threads:
+            t.join()
+        if errors:
+            exc = errors[0]
+            if sys.version_info[0] >= 3:
+                raise exc[1].with_traceback(exc[2])
+            raise exc[1]
+        return self.results
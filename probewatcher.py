@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+# File: probewatcher.py
+# Purpose: Watches probe inputs and pushes signature changes to subscribers
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Event sources report the names of changed probe inputs (the
+    fingerprint names of probecache, e.g. "grub", "fstab", "net"). The
+    watcher then collects the signature again through its probecache, so
+    only the probes depending on a changed input run, and passes the
+    differences to the subscribers:
+        {'info.network': ('eth0: ...', 'eth0: ... ⋮ eth1: ...')}
+
+    A source has wait(timeout), returning a list of names (empty if
+    nothing changed), and close(). Sources:
+        inotifysource: grub.cfg and fstab, through inotify (ctypes)
+        pollingsource: any fingerprint, e.g. the sysfs PCI/USB/net lists
+        fakesource: names pushed by the caller (tests)
+"""
+
+import os
+import struct
+import select
+import threading
+try:
+    import queue
+except ImportError:
+    import Queue as queue # python2
+
+import probecache
+import records
+
+# inotify(7) flags
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+eventheader = struct.Struct("iIII") # wd, mask, cookie, len
+
+# Fingerprint name: watched file
+watchedfiles = {
+    "grub": "/boot/grub/grub.cfg",
+    "fstab": "/etc/fstab",
+    "osrelease": "/etc/os-release",
+}
+# Fingerprints polled when inotify is not available for them
+polledinputs = ("pci", "drivers", "usb", "net", "cpus")
+
+
+class inotifysource:
+    """ Watches the directories of files (changes are often written to a
+        new file that is renamed over the old one)
+        files: dictionary {name: path}
+        Raises OSError if inotify is not available.
+    """
+    def __init__(self, files=watchedfiles):
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+            use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.names = dict() # (wd, file name): fingerprint name
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        for (name, path) in files.items():
+            (d, f) = os.path.split(path)
+            wd = self.libc.inotify_add_watch(self.fd, d.encode("utf-8"), mask)
+            if wd < 0:
+                continue # Missing directory, e.g. no /boot/grub
+            self.names[(wd, f)] = name
+        if not self.names:
+            self.close()
+            raise OSError(ctypes.get_errno(), "No directory to watch")
+
+    def wait(self, timeout):
+        (r, w, x) = select.select([self.fd], [], [], timeout)
+        if not r:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError:
+            return []
+        changed = set()
+        i = 0
+        while i + eventheader.size <= len(data):
+            (wd, mask, cookie, length) = eventheader.unpack_from(data, i)
+            f = data[i + eventheader.size:i + eventheader.size + length].rstrip(b"\0")
+            i += eventheader.size + length
+            name = self.names.get((wd, f.decode("utf-8", "replace")))
+            if name:
+                changed.add(name)
+        return sorted(changed)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class pollingsource:
+    """ Computes fingerprints (see probecache.fingerprints) every
+        'interval' seconds and reports the changed ones
+    """
+    def __init__(self, names=polledinputs, interval=2.0):
+        self.names = names
+        self.interval = interval
+        self.last = self.poll()
+        self.closed = threading.Event()
+
+    def poll(self):
+        return dict((n, probecache.fingerprints[n]()) for n in self.names)
+
+    def wait(self, timeout):
+        if self.closed.wait(min(timeout, self.interval)):
+            return []
+        current = self.poll()
+        changed = sorted(n for n in self.names if current[n] != self.last[n])
+        self.last = current
+        return changed
+
+    def close(self):
+        self.closed.set()
+
+
+class fakesource:
+    """ Reports the names given to push(), e.g.
+            s = fakesource()
+            w = probewatcher(collect, logger=log, sources=[s])
+            s.push("net")
+    """
+    def __init__(self):
+        self.queue = queue.Queue()
+
+    def push(self, *names):
+        self.queue.put(list(names))
+
+    def wait(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+
+    def close(self):
+        pass
+
+def defaultsources(interval=2.0):
+    """ inotify for grub.cfg/fstab/os-release and polling for devices, or
+        polling for everything without inotify
+    """
+    try:
+        return [inotifysource(), pollingsource(polledinputs, interval)]
+    except (OSError, AttributeError): # AttributeError: libc without inotify
+        return [pollingsource(polledinputs + tuple(watchedfiles), interval)]
+
+
+def flatten(value, prefix="", out=None):
+    # {'info': {'cpu': 'x'}} => {'info.cpu': 'x'}
+    if out is None:
+        out = dict()
+    if isinstance(value, dict):
+        for (k, v) in value.items():
+            flatten(v, "{0}.{1}".format(prefix, k) if prefix else k, out)
+    else:
+        out[prefix] = value
+    return out
+
+def difference(old, new):
+    """ Returns {field: (old value, new value)} of two signatures,
+        without the probe runtimes
+    """
+    a = flatten(records.todict(old))
+    b = flatten(records.todict(new))
+    diff = dict()
+    for k in set(a) | set(b):
+        if k.startswith("timings.") or a.get(k) == b.get(k):
+            continue
+        diff[k] = (a.get(k), b.get(k))
+    return diff
+
+
+class probewatcher:
+    """ Keeps an up to date signature and calls the subscribers with the
+        differences when probe inputs change.
+
+        Example:
+            w = probewatcher(forum_signature_gtk3.collect, logger=log)
+            w.subscribe(lambda diff, signature: print(diff))
+            w.start()
+            ...
+            w.stop()
+    """
+    def __init__(self, collect, logger, sources=None, cache=None):
+        self.collect = collect
+        self.log = logger
+        self.sources = sources if sources is not None else defaultsources()
+        self.cache = cache or probecache.probecache(logger=logger)
+        self.subscribers = list()
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.threads = list()
+        self.signature = self.collect(logger=logger, cache=self.cache)
+
+    def subscribe(self, func):
+        """ func(diff, signature) is called from a watcher thread """
+        with self.lock:
+            self.subscribers.append(func)
+
+    def unsubscribe(self, func):
+        with self.lock:
+            self.subscribers.remove(func)
+
+    def handle(self, names):
+        """ Probes again after a change of the inputs 'names', returns the
+            differences (also passed to the subscribers)
+        """
+        with self.lock:
+            self.log.debug("Probe inputs changed: %s", ", ".join(names))
+            self.cache.refresh()
+            probecache.forgetfacts(names)
+            new = self.collect(logger=self.log, cache=self.cache)
+            diff = difference(self.signature, new)
+            self.signature = new
+            subscribers = list(self.subscribers)
+        if diff:
+            for func in subscribers:
+                try:
+                    func(diff, new)
+                except Exception as e:
+                    self.log.error("Subscriber failed: %s", e)
+        return diff
+
+    def watch(self, source):
+        while not self.stopped.is_set():
+            names = source.wait(0.5)
+            if names and not self.stopped.is_set():
+                self.handle(names)
+
+    def start(self):
+        for s in self.sources:
+            t = threading.Thread(target=self.watch, args=(s,))
+            t.daemon = True
+            t.start()
+            self.threads.append(t)
+
+    def stop(self):
+        # The threads notice within the 0.5s of wait(), then the sources
+        # (e.g. the inotify descriptor) are closed
+        self.stopped.set()
+        for t in self.threads:
+            t.join()
+        self.threads = list()
+        for s in self.sources:
+            s.close()
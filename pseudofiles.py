@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# File: pseudofiles.py
+# Purpose: Low-overhead reads of /proc and /sys files
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" /proc and /sys files report a size of 0 and are generated on read, so
+    they are read with os.read() calls into a buffer that is reused between
+    reads (one buffer per thread), and decoded once.
+"""
+
+import os
+import sys
+import threading
+
+py3 = sys.version_info[0] >= 3
+
+
+def readinto(fd, view):
+    # os.readv() fills the buffer without a temporary bytes object (python 3.3)
+    if hasattr(os, "readv"):
+        return os.readv(fd, [view])
+    data = os.read(fd, len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+class pseudofilereader:
+    """ Reads whole files with bulk os.read() calls into a reusable buffer.
+        With memo=True, every path is read only once during the lifetime of
+        the reader (e.g. one signature run).
+
+        Example:
+            r = pseudofilereader(memo=True)
+            r.read("/proc/cpuinfo")
+            r.readmany(["/sys/class/dmi/id/board_vendor", "/sys/class/dmi/id/board_name"])
+    """
+    def __init__(self, memo=False, bufsize=65536):
+        self.memo = dict() if memo else None
+        self.bufsize = bufsize
+        self.local = threading.local()
+
+    def buffer(self):
+        buf = getattr(self.local, "buf", None)
+        if buf is None:
+            buf = self.local.buf = bytearray(self.bufsize)
+        return buf
+
+    def readfd(self, fd):
+        buf = self.buffer()
+        view = memoryview(buf)
+        total = 0
+        while True:
+            if total == len(buf):
+                # Full: double the buffer and keep it for the next reads
+                if hasattr(view, "release"):
+                    view.release()
+                bigger = bytearray(len(buf) * 2)
+                bigger[:total] = buf
+                buf = self.local.buf = bigger
+                view = memoryview(buf)
+            n = readinto(fd, view[total:])
+            if n == 0:
+                break
+            total += n
+        if hasattr(view, "release"):
+            view.release()
+        if py3:
+            return buf[:total].decode("utf-8", "replace")
+        return bytes(buf[:total])
+
+    def read(self, path):
+        """ Returns the contents of a file as a string.
+            Raises IOError if the file cannot be read.
+        """
+        if self.memo is not None:
+            try:
+                return self.memo[path]
+            except KeyError:
+                pass
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                text = self.readfd(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            raise IOError(e.errno, e.strerror, path)
+        if self.memo is not None:
+            self.memo[path] = text
+        return text
+
+    def readmany(self, paths):
+        """ Reads many small files (e.g. sysfs attributes) in one batch.
+            Returns dictionary {path: contents}, None for unreadable files.
+        """
+        result = dict()
+        for p in paths:
+            try:
+                result[p] = self.read(p)
+            except IOError:
+                result[p] = None
+        return result
+
+
+reader = pseudofilereader() # Shared reader without memo
+
+def readfile(path):
+    """ Returns the contents of a file, see pseudofilereader.read() """
+    return reader.read(path)
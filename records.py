@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# File: records.py
+# Purpose: Typed records of probe results and their JSON and binary forms
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Records are namedtuples (no per-instance dictionary) or, for hostinfo
+    which is filled in by the probes, a class with __slots__.
+    Records are serialized without their field names:
+        encode(bootentry('Windows 7', None, ''))
+        {'@': 'bootentry', 'v': ['Windows 7', None, '']}
+    dumps()/loads() store the same structure with marshal, which is smaller
+    and faster than JSON.
+"""
+
+import json
+import marshal
+from collections import namedtuple
+
+recordtypes = dict() # Name: record class, for decode()
+
+
+def record(name, fields):
+    # Defines and registers a namedtuple record
+    cls = namedtuple(name, fields)
+    recordtypes[name] = cls
+    return cls
+
+# Operating systems of the machine, from osgrubber
+hostfacts = record("hostfacts", "osinfo arch iswubi lang oslist osdict morethan2")
+# A grub menu entry in hostfacts.osdict {device: [bootentry, ...]}
+bootentry = record("bootentry", "title linuxstr version")
+# Devices of sysfsdevices.listpci() and listusb()
+pcidevice = record("pcidevice", "slot vendor device pciclass revision driver "
+    "subvendor subdevice pci_id")
+usbdevice = record("usbdevice", "name bus devnum vendor device usbclass revision "
+    "driver manufacturer product")
+# Result of forum_signature_gtk3.collect(): the three parts of the signature
+# text, hostfacts, hostinfo and probe runtimes
+signature = record("signature", "knowledge osinfo specs osgrubber info timings")
+
+
+class hostinfo(object):
+    """ Hardware information of core (lines 3-5 of the signature).
+        core: (vendor, name) of the motherboard or system
+    """
+    __slots__ = ("cpu", "memory", "display", "system", "core", "network")
+
+    def __init__(self, *values, **kw):
+        for (name, value) in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for (name, value) in kw.items():
+            setattr(self, name, value)
+
+    def __iter__(self):
+        return iter([getattr(self, n, None) for n in self.__slots__])
+
+    def __eq__(self, other):
+        return isinstance(other, hostinfo) and list(self) == list(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "hostinfo({0})".format(", ".join("{0}={1!r}".format(n, v)
+            for (n, v) in zip(self.__slots__, self)))
+
+recordtypes["hostinfo"] = hostinfo
+
+
+def encode(value):
+    """ Returns value as lists, dictionaries and scalars, for JSON and marshal.
+        Records, tuples and sets are tagged dictionaries.
+    """
+    if isinstance(value, (list, tuple, set, frozenset, hostinfo)):
+        name = type(value).__name__
+        if name in recordtypes and recordtypes[name] is type(value):
+            return {"@": name, "v": [encode(v) for v in value]}
+        if isinstance(value, tuple):
+            return {"__tuple__": [encode(v) for v in value]}
+        if isinstance(value, (set, frozenset)):
+            return {"__set__": [encode(v) for v in sorted(value)]}
+        return [encode(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, encode(v)) for (k, v) in value.items())
+    return value
+
+def decode(value):
+    if isinstance(value, list):
+        return [decode(v) for v in value]
+    if isinstance(value, dict):
+        if "@" in value:
+            return recordtypes[value["@"]](*[decode(v) for v in value["v"]])
+        if "__tuple__" in value:
+            return tuple(decode(v) for v in value["__tuple__"])
+        if "__set__" in value:
+            return set(decode(v) for v in value["__set__"])
+        return dict((k, decode(v)) for (k, v) in value.items())
+    return value
+
+def todict(value):
+    """ Returns value as plain JSON data for other programs: records are
+        dictionaries of their fields, tuples and sets are lists
+    """
+    if isinstance(value, hostinfo) or (isinstance(value, tuple) and hasattr(value, "_fields")):
+        fields = value.__slots__ if isinstance(value, hostinfo) else value._fields
+        return dict((n, todict(v)) for (n, v) in zip(fields, value))
+    if isinstance(value, (set, frozenset)):
+        return [todict(v) for v in sorted(value)]
+    if isinstance(value, (list, tuple)):
+        return [todict(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, todict(v)) for (k, v) in value.items())
+    return value
+
+def tojson(value):
+    return json.dumps(encode(value), separators=(",", ":"))
+
+def fromjson(text):
+    return decode(json.loads(text))
+
+def dumps(value):
+    """ Binary form: marshal version 2, readable by python 2.7 and 3 """
+    return marshal.dumps(encode(value), 2)
+
+def loads(data):
+    return decode(marshal.loads(data))
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+# File: signaturedaemon.py
+# Purpose: Serves the signature of this machine over a Unix socket, probing only what changed
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Protocol: the client sends a command line ("text", "json" or "ping")
+    and reads the answer "<length>\\n<utf-8 data>". A connection may send
+    any number of commands.
+        $ forum_signature_gtk3.py --daemon /run/user/1000/forum-signature.sock
+        >>> query("/run/user/1000/forum-signature.sock", "text")
+        '1 Γνώσεις Linux: � ┃ ...'
+
+    The probe results are kept in a probecache. The fingerprints of the
+    probe inputs (see probecache.probeinputs) are checked at most every
+    'maxage' seconds; if one changed, only the probes depending on it run
+    again. The environment fingerprint (LANG, desktop) is the daemon's.
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import socket
+import threading
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver # python2
+
+from probecache import probecache, forgetfacts
+import records
+
+py3 = sys.version_info[0] >= 3
+
+
+def socketpath():
+    # $XDG_RUNTIME_DIR/forum-signature.sock, or in the cache directory
+    d = os.getenv("XDG_RUNTIME_DIR")
+    if not d:
+        from idsdatabase import cachedirectory
+        d = cachedirectory()
+    return os.path.join(d, "forum-signature.sock")
+
+def sendframe(f, data):
+    if py3 and not isinstance(data, bytes):
+        data = data.encode("utf-8")
+    f.write("{0}\n".format(len(data)).encode("ascii") + data)
+    f.flush()
+
+def readframe(f):
+    # Returns the data of an answer, or None if the connection was closed
+    header = f.readline()
+    if not header:
+        return None
+    data = f.read(int(header))
+    return data.decode("utf-8") if py3 else data
+
+
+class signaturestate:
+    """ The last signature, its text and JSON forms, and the fingerprints
+        it was probed with
+    """
+    def __init__(self, collect, render, logger, maxage=1.0):
+        self.collect = collect
+        self.render = render
+        self.log = logger
+        self.maxage = maxage
+        self.cache = probecache(logger=logger)
+        self.lock = threading.Lock()
+        self.inputs = None
+        self.checked = 0
+        self.answers = None # {"text": ..., "json": ...}
+        self.probes = 0 # Number of collect() runs
+
+    def get(self):
+        """ Returns {"text": ..., "json": ...}, probing again if an input changed """
+        with self.lock:
+            now = time.time()
+            if self.answers is not None and now - self.checked < self.maxage:
+                return self.answers
+            self.cache.refresh()
+            inputs = self.cache.inputs()
+            if self.answers is None or inputs != self.inputs:
+                if self.inputs is not None:
+                    changed = sorted(k for k in inputs if inputs[k] != self.inputs.get(k))
+                    self.log.info("Probe inputs changed: %s", ", ".join(changed))
+                    forgetfacts(changed)
+                s = self.collect(logger=self.log, cache=self.cache)
+                self.answers = {
+                    "text": self.render(s),
+                    "json": json.dumps(records.todict(s), sort_keys=True),
+                }
+                self.inputs = inputs
+                self.probes += 1
+            self.checked = time.time()
+            return self.answers
+
+
+class requesthandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state = self.server.state
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            command = line.strip().decode("ascii", "replace")
+            if command == "ping":
+                sendframe(self.wfile, "pong")
+            elif command in ("text", "json"):
+                sendframe(self.wfile, state.get()[command])
+            else:
+                sendframe(self.wfile, "error: unknown command")
+
+
+class signaturedaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Unix socket server, one thread per connection.
+
+        Example:
+            d = signaturedaemon("/tmp/fs.sock", collect, render, logger=log)
+            d.serve_forever()
+    """
+    daemon_threads = True
+
+    def __init__(self, path, collect, render, logger, maxage=1.0):
+        self.path = path
+        self.log = logger
+        self.state = signaturestate(collect, render, logger, maxage)
+        try:
+            mode = os.lstat(path).st_mode
+        except OSError:
+            mode = None
+        if mode is not None:
+            if not stat.S_ISSOCK(mode):
+                raise RuntimeError("{0} exists and is not a socket".format(path))
+            # Stale socket of a daemon that did not exit cleanly
+            try:
+                query(path, "ping", timeout=1)
+                raise RuntimeError("A daemon already listens on {0}".format(path))
+            except socket.error:
+                os.remove(path)
+        d = os.path.dirname(path)
+        if d and not os.path.isdir(d):
+            os.makedirs(d)
+        socketserver.UnixStreamServer.__init__(self, path, requesthandler)
+        os.chmod(path, 0o600)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def connect(path, timeout=None):
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    s.connect(path)
+    return s
+
+def query(path, command="text", timeout=10):
+    """ Sends one command to a daemon, returns the answer """
+    s = connect(path, timeout)
+    try:
+        f = s.makefile("rwb")
+        f.write(command.encode("ascii") + b"\n")
+        f.flush()
+        return readframe(f)
+    finally:
+        s.close()
@@ -0,0 +1,298 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+# File: snapshot.py
+# Purpose: Captures the probe inputs of a system into a small file and replays them
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" capture() runs the probes once through a recordingroot, which keeps
+    every answer of the system: file contents (or that a file is missing),
+    directory lists, link targets, command outputs, the environment
+    variables the probes use and uname. The ids names of the devices are
+    kept too, so a replay does not depend on the pci.ids of the analysis
+    machine. A snapshotroot answers the same calls from the file, so the
+    probes give the same signature on any machine:
+        snapshot.capture("host1.fss")
+        forum_signature_gtk3.collect(root="host1.fss")
+
+    File format:
+        magic | index length (uint32) | zlib(index) | zlib(blobs)
+    The index (marshal version 2) maps paths and commands to blobs, which
+    are the distinct contents, stored once each (sysfs has many identical
+    small files) as (offset, length) in the blobs section.
+"""
+
+import os
+import sys
+import time
+import zlib
+import errno
+import struct
+import marshal
+
+import sysroot
+import mounttable
+
+magic = b"FSSNAP01"
+version = 1
+header = struct.Struct("<8sI") # magic, index length
+py3 = sys.version_info[0] >= 3
+try:
+    text_type = unicode # python 2
+except NameError:
+    text_type = str
+
+
+def issnapshot(filename):
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(magic)) == magic
+    except IOError:
+        return False
+
+def missing(path, exception=IOError):
+    return exception(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+
+class recordingroot(sysroot.sysroot):
+    """ Passes every call to another sysroot (the live system by default)
+        and records the answers. Failures are recorded too: a replay
+        raises the same errors. /etc/fstab is recorded without its option
+        values, which may hold credentials (see mounttable.redactfstab).
+    """
+    def __init__(self, inner=sysroot.live):
+        self.inner = inner
+        self.files = dict() # Path: text, None if it cannot be read
+        self.dirs = dict() # Path: names, None if it cannot be listed
+        self.links = dict() # Path: target, None if not a link
+        self.kinds = dict() # Path: "file", "dir" or "" (isfile/isdir)
+        self.commands = dict() # "lspci -nn": output
+        self.environment = dict()
+        self.unamevalues = None
+
+    def read(self, path):
+        try:
+            text = self.inner.read(path)
+        except IOError:
+            self.files[path] = None
+            raise
+        self.files[path] = mounttable.redactfstab(text) if path == mounttable.fstabfile else text
+        return text
+
+    def listdir(self, path):
+        try:
+            names = sorted(self.inner.listdir(path))
+        except OSError:
+            self.dirs[path] = None
+            raise
+        self.dirs[path] = names
+        return names
+
+    def readlink(self, path):
+        try:
+            target = self.inner.readlink(path)
+        except OSError:
+            self.links[path] = None
+            raise
+        self.links[path] = target
+        return target
+
+    def kind(self, path):
+        if not path in self.kinds:
+            if self.inner.isfile(path):
+                self.kinds[path] = "file"
+            elif self.inner.isdir(path):
+                self.kinds[path] = "dir"
+            else:
+                self.kinds[path] = ""
+        return self.kinds[path]
+
+    def isfile(self, path):
+        return self.kind(path) == "file"
+
+    def isdir(self, path):
+        return self.kind(path) == "dir"
+
+    def hostpath(self, path):
+        return self.inner.hostpath(path)
+
+    def idnames(self, kind):
+        return self.inner.idnames(kind)
+
+    def environ(self):
+        # Only the variables of the probes, not the whole environment
+        env = self.inner.environ()
+        self.environment = dict((n, env[n]) for n in sysroot.environnames if n in env)
+        return self.environment
+
+    def uname(self):
+        u = tuple(self.inner.uname())
+        self.unamevalues = u[:1] + ("",) + u[2:] # Without the host name
+        return u
+
+    def run(self, argv, runner=None):
+        output = self.inner.run(argv, runner)
+        self.commands[" ".join(argv)] = output
+        return output
+
+
+def dumps(rec, names=None):
+    """ Returns the snapshot file data of a recordingroot.
+        names: {"pci": pcinames(), "usb": usbnames()}
+    """
+    blobs = list()
+    blobids = dict() # Content: blob number
+    def blob(text):
+        if text is None:
+            return -1
+        data = text.encode("utf-8") if isinstance(text, text_type) else text
+        if not data in blobids:
+            blobids[data] = len(blobs)
+            blobs.append(data)
+        return blobids[data]
+    index = {
+        "version": version,
+        "created": int(time.time()),
+        "files": dict((p, blob(t)) for (p, t) in rec.files.items()),
+        "dirs": rec.dirs,
+        "links": rec.links,
+        "kinds": rec.kinds,
+        "commands": dict((c, blob(t)) for (c, t) in rec.commands.items()),
+        "environ": rec.environment,
+        "uname": list(rec.unamevalues or ()),
+        "names": names or dict(),
+    }
+    offsets = list()
+    offset = 0
+    for data in blobs:
+        offsets.append((offset, len(data)))
+        offset += len(data)
+    index["blobs"] = offsets
+    packedindex = zlib.compress(marshal.dumps(index, 2), 9)
+    packedblobs = zlib.compress(b"".join(blobs), 9)
+    return header.pack(magic, len(packedindex)) + packedindex + packedblobs
+
+def loads(data, withblobs=True):
+    """ Returns (index, blobs data) of snapshot file data """
+    (m, length) = header.unpack_from(data)
+    if m != magic:
+        raise ValueError("Not a snapshot file")
+    index = marshal.loads(zlib.decompress(data[header.size:header.size + length]))
+    if index.get("version") != version:
+        raise ValueError("Unsupported snapshot version: {0}".format(index.get("version")))
+    blobs = zlib.decompress(data[header.size + length:]) if withblobs else None
+    return (index, blobs)
+
+def load(filename, withblobs=True):
+    with open(filename, "rb") as f:
+        return loads(f.read(), withblobs)
+
+
+class snapshotroot(sysroot.sysroot):
+    """ Replays a snapshot file. Calls that were not recorded answer like
+        a missing file.
+    """
+    def __init__(self, filename):
+        self.path = filename
+        (self.index, self.blobs) = load(filename)
+
+    def text(self, number):
+        (offset, length) = self.index["blobs"][number]
+        data = self.blobs[offset:offset + length]
+        return data.decode("utf-8") if py3 else data
+
+    def read(self, path):
+        number = self.index["files"].get(path, -1)
+        if number < 0:
+            raise missing(path)
+        return self.text(number)
+
+    def listdir(self, path):
+        names = self.index["dirs"].get(path)
+        if names is None:
+            raise missing(path, OSError)
+        return list(names)
+
+    def readlink(self, path):
+        target = self.index["links"].get(path)
+        if target is None:
+            raise missing(path, OSError)
+        return target
+
+    def isfile(self, path):
+        return self.index["kinds"].get(path) == "file"
+
+    def isdir(self, path):
+        return self.index["kinds"].get(path) == "dir"
+
+    def idnames(self, kind):
+        return self.index["names"].get(kind)
+
+    def environ(self):
+        return dict(self.index["environ"])
+
+    def uname(self):
+        return tuple(self.index["uname"]) or sysroot.sysroot.uname(self)
+
+    def run(self, argv, runner=None):
+        number = self.index["commands"].get(" ".join(argv), -1)
+        return self.text(number) if number >= 0 else ""
+
+
+def capture(filename, logger=None, inner=sysroot.live):
+    """ Probes inner (this system, or another sysroot to convert it) and
+        writes a snapshot file.
+        Returns (signature, size of the file in bytes).
+    """
+    import forum_signature_gtk3
+    import sysfsdevices
+    rec = recordingroot(inner)
+    s = forum_signature_gtk3.collect(usecache=False, logger=logger, root=rec)
+    names = {
+        "pci": sysfsdevices.pcinames(sysfsdevices.listpci(root=rec), root=rec),
+        "usb": sysfsdevices.usbnames(sysfsdevices.listusb(root=rec), root=rec),
+    }
+    data = dumps(rec, names)
+    d = os.path.dirname(filename)
+    if d and not os.path.isdir(d):
+        os.makedirs(d)
+    tmp = "{0}.{1}.tmp".format(filename, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.rename(tmp, filename)
+    return (s, len(data))
+
+
+def main(argv=None):
+    """ Lists the index of snapshot files """
+    for filename in (argv if argv is not None else sys.argv[1:]):
+        (index, blobs) = load(filename, withblobs=False)
+        sizes = [length for (offset, length) in index["blobs"]]
+        print("{0}: {1} bytes, {2} files, {3} distinct contents ({4} bytes), captured {5}".format(
+            filename, os.path.getsize(filename), len(index["files"]), len(sizes),
+            sum(sizes), time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(index["created"]))))
+        print("  uname: {0}".format(" ".join(x for x in index["uname"] if x)))
+        for (name, value) in sorted(index["environ"].items()):
+            print("  {0}={1}".format(name, value))
+        for (path, number) in sorted(index["files"].items()):
+            print("  {0:>7} {1}".format(sizes[number] if number >= 0 else "missing", path))
+        for (command, number) in sorted(index["commands"].items()):
+            print("  {0:>7} $ {1}".format(sizes[number] if number >= 0 else "missing", command))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
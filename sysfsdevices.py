@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+# File: sysfsdevices.py
+# Purpose: Enumerates PCI/USB devices from sysfs, without lspci/lsusb
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Example of lspci -nn compatible line produced by pciinventory.lspcitext():
+01:00.0 VGA compatible controller [0300]: NVIDIA Corporation G73 [GeForce 7300 GT] [10de:0393] (rev a1)
+    Example of lsusb compatible line produced by lsusbtext():
+Bus 002 Device 004: ID 0cf3:1002 Atheros Communications, Inc. TP-Link TL-WN821N v2
+"""
+
+import os
+import os.path
+
+import idsdatabase
+from sysroot import live
+from records import pcidevice, usbdevice
+
+pcidir = "/sys/bus/pci/devices"
+usbdir = "/sys/bus/usb/devices"
+# Same search order as pciutils/usbutils
+pciids_files = [
+    "/usr/share/misc/pci.ids",
+    "/usr/share/hwdata/pci.ids",
+    "/usr/share/pci.ids",
+]
+usbids_files = [
+    "/var/lib/usbutils/usb.ids",
+    "/usr/share/misc/usb.ids",
+    "/usr/share/hwdata/usb.ids",
+    "/usr/share/usb.ids",
+]
+
+
+def readattr(path, name, root=live):
+    # Returns a stripped sysfs attribute, or "" if it does not exist
+    try:
+        return root.read(os.path.join(path, name)).strip()
+    except IOError:
+        return ""
+
+def hexattr(path, name, width=4, root=live):
+    # "0x10de" => "10de"
+    s = readattr(path, name, root)
+    if s.startswith("0x"):
+        s = s[2:]
+    return s.lower().zfill(width) if s else ""
+
+def driverlink(path, root=live):
+    # Returns the name of the bound driver (e.g. "e1000e"), or ""
+    try:
+        return os.path.basename(root.readlink(os.path.join(path, "driver")))
+    except (IOError, OSError):
+        return ""
+
+def scandir(directory, root=live):
+    # Returns [(name, path)] of a directory, sorted by name
+    # os.scandir() needs python 3.5, os.listdir() is the fallback
+    if root.live and hasattr(os, "scandir"):
+        entries = [(e.name, e.path) for e in os.scandir(directory)]
+    else:
+        entries = [(n, os.path.join(directory, n)) for n in root.listdir(directory)]
+    entries.sort()
+    return entries
+
+def parseuevent(text):
+    # "DRIVER=e1000e\nPCI_ID=8086:10D3\n" => {'DRIVER': 'e1000e', 'PCI_ID': '8086:10D3'}
+    d = dict()
+    for line in text.splitlines():
+        (key, sep, value) = line.partition("=")
+        if sep:
+            d[key] = value
+    return d
+
+def listpci(directory=pcidir, root=live):
+    """ Returns a list of pcidevice records read from sysfs, e.g.
+        pcidevice(slot='0000:01:00.0', vendor='10de', device='0393',
+         pciclass='030000', revision='a1', driver='nouveau',
+         subvendor='1462', subdevice='0c45', pci_id='10DE:0393')
+        Only uevent and revision are read for each device.
+        Returns an empty list if sysfs is not available.
+    """
+    try:
+        entries = scandir(directory, root)
+    except OSError:
+        return list()
+    devices = list()
+    for (slot, p) in entries:
+        uevent = parseuevent(readattr(p, "uevent", root))
+        (vendor, sep, device) = uevent.get("PCI_ID", "").lower().partition(":")
+        (subvendor, sep, subdevice) = uevent.get("PCI_SUBSYS_ID", "").lower().partition(":")
+        devices.append(pcidevice(
+            slot=slot,
+            vendor=vendor,
+            device=device,
+            pciclass=uevent.get("PCI_CLASS", "").lower().zfill(6),
+            revision=hexattr(p, "revision", 2, root),
+            driver=uevent.get("DRIVER", ""),
+            subvendor=subvendor,
+            subdevice=subdevice,
+            pci_id=uevent.get("PCI_ID", ""),
+        ))
+    return devices
+
+def listusb(directory=usbdir, root=live):
+    """ Returns a list of usbdevice records read from sysfs, e.g.
+        usbdevice(name='2-1', bus=2, devnum=4, vendor='0cf3',
+         device='1002', usbclass='00', revision='0108', driver='usb',
+         manufacturer='ATHEROS', product='USB2.0 WLAN')
+        Interfaces (e.g. "2-1:1.0") are skipped.
+        Returns an empty list if sysfs is not available.
+    """
+    try:
+        names = root.listdir(directory)
+    except OSError:
+        return list()
+    devices = list()
+    for name in names:
+        if ":" in name:
+            continue
+        p = os.path.join(directory, name)
+        vendor = hexattr(p, "idVendor", root=root)
+        if not vendor:
+            continue
+        try:
+            bus = int(readattr(p, "busnum", root))
+            devnum = int(readattr(p, "devnum", root))
+        except ValueError:
+            continue
+        devices.append(usbdevice(
+            name=name,
+            bus=bus,
+            devnum=devnum,
+            vendor=vendor,
+            device=hexattr(p, "idProduct", root=root),
+            usbclass=hexattr(p, "bDeviceClass", 2, root),
+            revision=hexattr(p, "bcdDevice", root=root),
+            driver=driverlink(p, root),
+            manufacturer=readattr(p, "manufacturer", root),
+            product=readattr(p, "product", root),
+        ))
+    devices.sort(key=lambda d: (d.bus, d.devnum))
+    return devices
+
+def findids(candidates, root=live):
+    """ Returns the first existing ids file, or None.
+        The ids files of a captured directory come first (the names its
+        lspci would have shown), then those of this system.
+    """
+    paths = [root.hostpath(f) for f in candidates] if not root.live else []
+    for f in [p for p in paths if p] + candidates:
+        if os.path.isfile(f):
+            return f
+    return None
+
+def pcinames(devices, idsfile=None, root=live):
+    """ Resolves the names of a listpci() result through the ids database.
+        Returns dictionary: {'10de': 'NVIDIA Corporation',
+            '10de:0393': 'G73 [GeForce 7300 GT]', 'C 03': 'Display controller',
+            'C 0300': 'VGA compatible controller'}
+        A captured sysroot may carry the names resolved on its machine.
+    """
+    if idsfile is None:
+        names = root.idnames("pci")
+        if names is not None:
+            return names
+        idsfile = findids(pciids_files, root)
+    db = idsdatabase.getdatabase(idsfile)
+    names = dict()
+    if db is None:
+        return names
+    for d in devices:
+        v = d.vendor
+        c = d.pciclass
+        for (key, name) in [
+            (v, db.vendor(v)),
+            ("{0}:{1}".format(v, d.device), db.device(v, d.device)),
+            ("C " + c[:2], db.classname(c[:2])),
+            ("C " + c[:4], db.subclass(c[:2], c[2:4])),
+        ]:
+            if name is not None:
+                names[key] = name
+    return names
+
+def usbnames(devices, idsfile=None, root=live):
+    # Resolves the names of a listusb() result, see pcinames()
+    if idsfile is None:
+        names = root.idnames("usb")
+        if names is not None:
+            return names
+        idsfile = findids(usbids_files, root)
+    db = idsdatabase.getdatabase(idsfile)
+    names = dict()
+    if db is None:
+        return names
+    for d in devices:
+        v = d.vendor
+        for (key, name) in [
+            (v, db.vendor(v)),
+            ("{0}:{1}".format(v, d.device), db.device(v, d.device)),
+        ]:
+            if name is not None:
+                names[key] = name
+    return names
+
+def lsusbtext(devices, names):
+    """ Returns lsusb compatible text for a listusb() result """
+    lines = list()
+    for d in devices:
+        # usb.ids names first, device strings as fallback
+        vendor = names.get(d.vendor) or d.manufacturer
+        device = names.get("{0}:{1}".format(d.vendor, d.device)) or d.product
+        desc = "{0} {1}".format(vendor, device).strip()
+        lines.append("Bus {0:03d} Device {1:03d}: ID {2}:{3} {4}".format(
+            d.bus, d.devnum, d.vendor, d.device, desc).rstrip())
+    return "\n".join(lines)
+
+
+class pciinventory:
+    """ The PCI devices of the system, read from sysfs in a single walk.
+        Shared by the display, network and driver probes, which query it by
+        class code or slot instead of reading sysfs or lspci text again.
+
+        Example:
+            pci = pciinventory()
+            for d in pci.byclass("0300", "0302"): # VGA and 3D controllers
+                print(pci.name(d)) # 'NVIDIA Corporation G73 [GeForce 7300 GT]'
+    """
+    def __init__(self, directory=pcidir, idsfile=None, root=live):
+        self.devices = listpci(directory, root)
+        self.root = root
+        self.slots = dict((d.slot, d) for d in self.devices)
+        self.idsfile = idsfile
+        self.names = None # Resolved on first use
+
+    def byclass(self, *prefixes):
+        # Devices whose class code starts with one of the prefixes
+        return [d for d in self.devices if d.pciclass.startswith(prefixes)]
+
+    def byslot(self, slot):
+        return self.slots.get(slot)
+
+    def moduledrivers(self):
+        """ Returns dictionary {'10DE:0393': 'nouveau'} of devices with a driver """
+        return dict((d.pci_id, d.driver) for d in self.devices if d.driver)
+
+    def getnames(self):
+        if self.names is None:
+            self.names = pcinames(self.devices, self.idsfile, self.root)
+        return self.names
+
+    def classname(self, d):
+        names = self.getnames()
+        c = d.pciclass[:4]
+        return names.get("C " + c) or names.get("C " + c[:2]) or "Class"
+
+    def name(self, d):
+        # 'NVIDIA Corporation G73 [GeForce 7300 GT]'
+        names = self.getnames()
+        vendor = names.get(d.vendor, "")
+        device = names.get("{0}:{1}".format(d.vendor, d.device), "Device")
+        return "{0} {1}".format(vendor, device).strip()
+
+    def description(self, d):
+        # 'NVIDIA Corporation G73 [GeForce 7300 GT] [10de:0393] (rev a1)'
+        s = "{0} [{1}:{2}]".format(self.name(d), d.vendor, d.device)
+        if d.revision and d.revision != "00":
+            s += " (rev {0})".format(d.revision)
+        return s
+
+    def lspcitext(self):
+        """ Returns lspci -nn compatible text """
+        lines = list()
+        # lspci hides the PCI domain if all devices are in domain 0000
+        hidedomain = all(d.slot.startswith("0000:") for d in self.devices)
+        for d in self.devices:
+            slot = d.slot[5:] if hidedomain else d.slot
+            lines.append("{0} {1} [{2}]: {3}".format(slot, self.classname(d),
+                d.pciclass[:4], self.description(d)))
+        return "\n".join(lines)
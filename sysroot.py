@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+# File: sysroot.py
+# Purpose: The files and command outputs the probes read, from this system or a capture of another one
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" A sysroot is what the probes read: the running system (live), a
+    directory holding captured /proc, /sys, /boot and /etc files, or a
+    tar/zip archive of such a directory, read in place without extracting.
+    Paths are always the paths of the probed machine:
+        r = openroot("captures/host1.tar.gz")
+        r.read("/proc/cpuinfo")
+        r.listdir("/sys/bus/pci/devices")
+        r.readlink("/sys/class/net/eth0/device")
+        '../../../0000:02:00.0'
+        r.run(["lspci", "-nn"], runner)
+
+    A capture also holds, under /.forum-signature/:
+        commands/<argv joined by spaces>: recorded output, e.g. "commands/lspci -nn"
+        environ: NAME=value lines (LANG, DESKTOP_SESSION, ...)
+        uname: sysname, nodename, release, version and machine lines
+        pci.names, usb.names: "<key>\t<name>" lines of the device names
+            resolved on the captured machine (see sysfsdevices.pcinames)
+    Snapshot files (see snapshot.py) are opened as a snapshotroot.
+"""
+
+import io
+import os
+import sys
+import errno
+import threading
+
+from pseudofiles import pseudofilereader, readfile
+
+py3 = sys.version_info[0] >= 3
+metadir = "/.forum-signature"
+# Environment variables read by the probes, recorded by captures
+environnames = ("LANG", "XDG_CURRENT_DESKTOP", "DESKTOP_SESSION", "GDMSESSION")
+
+
+def commandfile(argv):
+    # ["lspci", "-nn"] => "/.forum-signature/commands/lspci -nn"
+    return "{0}/commands/{1}".format(metadir, " ".join(argv))
+
+def parseenviron(text):
+    # "LANG=el_GR.UTF-8\n" => {'LANG': 'el_GR.UTF-8'}
+    d = dict()
+    for line in text.splitlines():
+        (key, sep, value) = line.partition("=")
+        if sep:
+            d[key] = value
+    return d
+
+
+class rootreader:
+    """ pseudofilereader interface (read, readmany) for a captured sysroot,
+        with memo=True every path is read only once
+    """
+    def __init__(self, root, memo=False):
+        self.root = root
+        self.memo = dict() if memo else None
+
+    def read(self, path):
+        if self.memo is not None:
+            try:
+                return self.memo[path]
+            except KeyError:
+                pass
+        text = self.root.read(path)
+        if self.memo is not None:
+            self.memo[path] = text
+        return text
+
+    def readmany(self, paths):
+        result = dict()
+        for p in paths:
+            try:
+                result[p] = self.read(p)
+            except IOError:
+                result[p] = None
+        return result
+
+
+class sysroot:
+    """ Base of the captured sysroots. Subclasses implement read(),
+        listdir(), readlink(), isfile() and isdir(); missing files raise
+        IOError (read) or OSError.
+    """
+    live = False
+
+    def reader(self, memo=False):
+        return rootreader(self, memo)
+
+    def open(self, path):
+        # Text stream of a file, for line by line parsers
+        return io.StringIO(self.read(path) if py3 else self.read(path).decode("utf-8", "replace"))
+
+    def hostpath(self, path):
+        # Path of the file on this system, None if it is inside an archive
+        return None
+
+    def metafile(self, name):
+        try:
+            return self.read("{0}/{1}".format(metadir, name))
+        except IOError:
+            return ""
+
+    def environ(self):
+        return parseenviron(self.metafile("environ"))
+
+    def idnames(self, kind):
+        """ Device names of the captured machine ("pci" or "usb"), or
+            None to resolve them with the ids files of this system
+        """
+        text = self.metafile(kind + ".names")
+        if not text:
+            return None
+        return dict(line.split("\t", 1) for line in text.splitlines() if "\t" in line)
+
+    def uname(self):
+        """ (sysname, nodename, release, version, machine) of the captured
+            machine, from the uname file or from /proc/sys/kernel
+        """
+        values = self.metafile("uname").splitlines()
+        if len(values) >= 5:
+            return tuple(v.strip() for v in values[:5])
+        values = list()
+        for name in ("ostype", "hostname", "osrelease", "version"):
+            try:
+                values.append(self.read("/proc/sys/kernel/" + name).strip())
+            except IOError:
+                values.append("")
+        return tuple(values) + ("",)
+
+    def run(self, argv, runner=None):
+        """ Recorded output of a command, "" if it was not recorded
+            (like a command that is missing or fails)
+        """
+        try:
+            return self.read(commandfile(argv))
+        except IOError:
+            return ""
+
+    def close(self):
+        pass
+
+
+class liveroot(sysroot):
+    """ The running system, read directly """
+    live = True
+    path = "/"
+
+    def reader(self, memo=False):
+        return pseudofilereader(memo=memo)
+
+    def read(self, path):
+        return readfile(path)
+
+    def open(self, path):
+        return open(path, "r")
+
+    def listdir(self, path):
+        return os.listdir(path)
+
+    def readlink(self, path):
+        return os.readlink(path)
+
+    def isfile(self, path):
+        return os.path.isfile(path)
+
+    def isdir(self, path):
+        return os.path.isdir(path)
+
+    def hostpath(self, path):
+        return path
+
+    def environ(self):
+        return os.environ
+
+    def idnames(self, kind):
+        return None
+
+    def uname(self):
+        return tuple(os.uname())
+
+    def run(self, argv, runner=None):
+        return runner.run(argv)
+
+live = liveroot()
+
+
+def splitpath(path):
+    return [x for x in path.split("/") if x and x != "."]
+
+maxlinks = 40 # Like the kernel's MAXSYMLINKS
+
+def resolvepath(path, linktarget, follow=True):
+    """ Returns path with the symbolic links of its directories (and of the
+        last name if follow) resolved, "/" and ".." staying in the root.
+        linktarget(path) returns the target of a link, or None.
+    """
+    parts = splitpath(path)
+    done = ""
+    links = 0
+    while parts:
+        name = parts.pop(0)
+        if name == "..":
+            done = done.rpartition("/")[0]
+            continue
+        current = done + "/" + name
+        target = linktarget(current) if (parts or follow) else None
+        if target is not None:
+            links += 1
+            if links > maxlinks:
+                raise OSError(errno.ELOOP, os.strerror(errno.ELOOP), path)
+            if target.startswith("/"):
+                done = ""
+            parts = splitpath(target) + parts
+            continue
+        done = current
+    return done or "/"
+
+
+class directoryroot(sysroot):
+    """ A directory holding a capture, e.g. captures/host1/proc/cpuinfo
+        Symbolic links are resolved inside the directory: an absolute
+        target is a path of the captured machine, not of this one.
+    """
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.files = pseudofilereader()
+        self.resolved = dict() # (path, follow): path without links
+
+    def linktarget(self, path):
+        try:
+            return os.readlink(os.path.join(self.path, path.lstrip("/")))
+        except OSError:
+            return None # Not a link, or missing
+
+    def realpath(self, path, follow=True):
+        # Host path of path, with its links resolved inside the directory
+        key = (path, follow)
+        p = self.resolved.get(key)
+        if p is None:
+            p = self.resolved[key] = os.path.join(self.path,
+                resolvepath(path, self.linktarget, follow).lstrip("/"))
+        return p
+
+    def hostpath(self, path):
+        return self.realpath(path)
+
+    def read(self, path):
+        return self.files.read(self.realpath(path))
+
+    def open(self, path):
+        return open(self.realpath(path), "r")
+
+    def listdir(self, path):
+        return os.listdir(self.realpath(path))
+
+    def readlink(self, path):
+        return os.readlink(self.realpath(path, follow=False))
+
+    def isfile(self, path):
+        return os.path.isfile(self.realpath(path))
+
+    def isdir(self, path):
+        return os.path.isdir(self.realpath(path))
+
+
+class archiveroot(sysroot):
+    """ A tar (any compression of tarfile) or zip archive of a capture
+        directory. The archive index is read once; files are decompressed
+        when read, symbolic links are resolved inside the archive.
+        Zip archives give random access to their members, compressed tar
+        archives are read again from the start for some seeks.
+    """
+    def __init__(self, path):
+        import zipfile
+        self.path = path
+        self.lock = threading.Lock()
+        self.members = dict() # Path: ("file", member), ("link", target) or ("dir", None)
+        self.dirs = dict() # Path: set of entry names
+        self.add("/", "dir", None)
+        if zipfile.is_zipfile(path):
+            self.archive = zipfile.ZipFile(path)
+            self.loadzip()
+        else:
+            import tarfile
+            try:
+                self.archive = tarfile.open(path)
+            except tarfile.TarError as e:
+                raise IOError(errno.EINVAL, "Not a tar or zip archive: {0}".format(e), path)
+            self.loadtar()
+
+    def add(self, path, kind, value):
+        # Adds a member and its parent directories
+        parts = splitpath(path)
+        path = "/" + "/".join(parts)
+        if kind != "dir" or not path in self.members:
+            self.members[path] = (kind, value)
+        for i in range(len(parts)):
+            parent = "/" + "/".join(parts[:i])
+            if not parent in self.members:
+                self.members[parent] = ("dir", None)
+            self.dirs.setdefault(parent, set()).add(parts[i])
+
+    def loadzip(self):
+        import stat
+        for info in self.archive.infolist():
+            mode = info.external_attr >> 16
+            if info.filename.endswith("/"):
+                self.add(info.filename, "dir", None)
+            elif stat.S_ISLNK(mode):
+                # Info-ZIP stores the link target as the member data
+                self.add(info.filename, "link", self.archive.read(info).decode("utf-8"))
+            else:
+                self.add(info.filename, "file", info)
+
+    def loadtar(self):
+        for m in self.archive.getmembers():
+            if m.isdir():
+                self.add(m.name, "dir", None)
+            elif m.issym():
+                self.add(m.name, "link", m.linkname)
+            elif m.islnk():
+                self.add(m.name, "link", "/" + "/".join(splitpath(m.linkname)))
+            elif m.isfile():
+                self.add(m.name, "file", m)
+
+    def resolve(self, path, follow=True):
+        """ Returns the archive path of path, with the symbolic links of
+            its directories (and of the last name if follow) resolved
+        """
+        return resolvepath(path, self.linktarget, follow)
+
+    def linktarget(self, path):
+        m = self.members.get(path)
+        return m[1] if m is not None and m[0] == "link" else None
+
+    def member(self, path, follow=True):
+        return self.members.get(self.resolve(path, follow))
+
+    def read(self, path):
+        m = self.member(path)
+        if m is None or m[0] != "file":
+            e = errno.EISDIR if m is not None else errno.ENOENT
+            raise IOError(e, os.strerror(e), path)
+        with self.lock:
+            if hasattr(self.archive, "extractfile"):
+                data = self.archive.extractfile(m[1]).read()
+            else:
+                data = self.archive.read(m[1])
+        return data.decode("utf-8", "replace") if py3 else data
+
+    def listdir(self, path):
+        p = self.resolve(path)
+        if not p in self.dirs:
+            e = errno.ENOTDIR if p in self.members else errno.ENOENT
+            raise OSError(e, os.strerror(e), path)
+        return sorted(self.dirs[p])
+
+    def readlink(self, path):
+        m = self.member(path, follow=False)
+        if m is None or m[0] != "link":
+            e = errno.EINVAL if m is not None else errno.ENOENT
+            raise OSError(e, os.strerror(e), path)
+        return m[1]
+
+    def isfile(self, path):
+        m = self.member(path)
+        return m is not None and m[0] == "file"
+
+    def isdir(self, path):
+        m = self.member(path)
+        return m is not None and m[0] == "dir"
+
+    def close(self):
+        self.archive.close()
+
+
+def openroot(path=None):
+    """ Returns the sysroot of path: live for None or "/", a directoryroot
+        for a directory, a snapshotroot for a snapshot file, an archiveroot
+        for other files. A sysroot is returned as it is.
+    """
+    if isinstance(path, sysroot):
+        return path
+    if path is None or os.path.abspath(path) == "/":
+        return live
+    if os.path.isdir(path):
+        return directoryroot(path)
+    if not os.path.isfile(path):
+        raise IOError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+    import snapshot
+    if snapshot.issnapshot(path):
+        return snapshot.snapshotroot(path)
+    return archiveroot(path)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# File: vendornormalizer.py
+# Purpose: Single-pass, longest-match-first replacement of vendor names
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Every key is indexed by its first characters (the prefix), together with
+    the lengths of the keys sharing that prefix, e.g. for
+    "Atheros Communications, Inc.", "Atheros Communications" and "(R)":
+        {'(R)': (3,), 'Ath': (28, 22)}
+    The text is scanned once, left to right. A regular expression of the
+    possible first characters skips to the next candidate position, where
+    only the key lengths of that prefix are tried, longest first. The cost
+    of a replacement depends on the length of the text and not on the number
+    of keys, and the index is cheap to build and to serialize.
+"""
+
+import re
+
+
+class vendornormalizer:
+    """ Replaces all keys of a dictionary in a text, in one pass.
+        Where keys overlap, the leftmost and then the longest key wins.
+
+        Example:
+            n = vendornormalizer({"Intel Corporation": "Intel", "(R)": ""})
+            n.replace("Intel Corporation 82801(R)") # 'Intel 82801'
+    """
+    def __init__(self, dic, state=None):
+        if state is None:
+            self.dic = dict((k, v) for (k, v) in dic.items() if k)
+            self.plen = min([4] + [len(k) for k in self.dic]) # prefix length
+            index = dict()
+            for k in self.dic:
+                index.setdefault(k[:self.plen], set()).add(len(k))
+            self.index = dict((p, tuple(sorted(l, reverse=True))) for (p, l) in index.items())
+            self.firstchars = "".join(sorted(set(k[0] for k in self.dic)))
+        else:
+            self.dic = dic # Already filtered when the state was built
+            (self.plen, self.index, self.firstchars) = state
+        if self.firstchars:
+            self.starts = re.compile("[{0}]".format("".join(re.escape(c) for c in self.firstchars)))
+        else:
+            self.starts = None
+
+    def getstate(self):
+        # The index as marshal/pickle friendly values, to be passed back
+        # as vendornormalizer(dic, state) without building it again
+        return (self.plen, self.index, self.firstchars)
+
+    def replace(self, text):
+        if self.starts is None:
+            return text
+        search = self.starts.search
+        getlengths = self.index.get
+        getreplacement = self.dic.get
+        plen = self.plen
+        out = list()
+        pos = 0 # End of the last replacement
+        i = 0
+        while True:
+            m = search(text, i)
+            if not m:
+                break
+            i = m.start()
+            for l in getlengths(text[i:i + plen], ()):
+                r = getreplacement(text[i:i + l])
+                if r is not None:
+                    out.append(text[pos:i])
+                    out.append(r)
+                    i += l
+                    pos = i
+                    break
+            else:
+                i += 1
+        if not out:
+            return text
+        out.append(text[pos:])
+        return "".join(out)
+
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# File: vendortable.py
+# Purpose: Loads the vendor abbreviation table (vendors.json) through a binary cache
+# Requires: python 2.7
+
+# Copyright (c) 2010-2012 Savvas Radevic <vicedar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+""" Example of vendors.json:
+{
+    "version": 1,
+    "replace": {"Intel Corporation": "Intel", "(R)": ""},
+    "defaults": ["System manufacturer", "To Be Filled By O.E.M."]
+}
+    "replace": text replacements of core.dicreplace()
+    "defaults": default motherboard id values, dropped by core.deldefcoreid()
+
+    The parsed table and its compiled vendornormalizer are stored in a
+    marshal cache (~/.cache/forum-signature/vendors.cache), which is only
+    rebuilt when vendors.json, the cache format or the python version change.
+"""
+
+import os
+import os.path
+import sys
+import json
+import marshal
+import threading
+
+from idsdatabase import cachedirectory
+import vendornormalizer
+
+tablefile = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vendors.json")
+tableversion = 1 # version of vendors.json
+cacheversion = 1 # version of the cache layout
+
+
+class vendortable:
+    """ The vendor abbreviation table.
+        dic: dictionary of replacements
+        defaults: list of default motherboard id values
+        normalizer: vendornormalizer of dic
+    """
+    def __init__(self, dic, defaults, normalizer=None):
+        self.dic = dic
+        self.defaults = defaults
+        self.normalizer = normalizer or vendornormalizer.vendornormalizer(dic)
+
+    def replace(self, text):
+        return self.normalizer.replace(text)
+
+
+def readtable(filename):
+    """ Parses a vendors.json file, returns a vendortable.
+        Raises ValueError if the file is not a valid table.
+    """
+    with open(filename, "rb") as f:
+        data = json.loads(f.read().decode("utf-8"))
+    if not isinstance(data, dict) or data.get("version") != tableversion:
+        raise ValueError("Unsupported vendor table: {0}".format(filename))
+    return vendortable(dict(data.get("replace", dict())), list(data.get("defaults", list())))
+
+def cachekey(filename):
+    # Everything the cache depends on
+    st = os.stat(filename)
+    return [cacheversion, list(sys.version_info[:2]), os.path.abspath(filename),
+        st.st_mtime, st.st_size]
+
+def loadtable(filename=tablefile, cachefile=None):
+    """ Returns the vendortable of filename, from the cache if it is valid """
+    if cachefile is None:
+        cachefile = os.path.join(cachedirectory(), "vendors.cache")
+    key = cachekey(filename)
+    try:
+        with open(cachefile, "rb") as f:
+            data = marshal.loads(f.read())
+        if data[0] == key:
+            (dic, defaults, state) = data[1:]
+            return vendortable(dic, defaults, vendornormalizer.vendornormalizer(dic, state))
+    except (IOError, OSError, EOFError, ValueError, TypeError, IndexError):
+        pass # Missing, stale or broken cache
+    table = readtable(filename)
+    data = [key, table.dic, table.defaults, table.normalizer.getstate()]
+    tmp = "{0}.{1}.tmp".format(cachefile, os.getpid())
+    try:
+        d = os.path.dirname(cachefile)
+        if not os.path.isdir(d):
+            os.makedirs(d)
+        with open(tmp, "wb") as f:
+            f.write(marshal.dumps(data))
+        os.rename(tmp, cachefile)
+    except (IOError, OSError):
+        pass
+    return table
+
+tables = dict() # filename: vendortable, shared by the whole process
+tableslock = threading.Lock()
+
+def gettable(filename=tablefile):
+    """ Returns the vendortable of filename, loaded once per process """
+    with tableslock:
+        t = tables.get(filename)
+        if t is None:
+            t = tables[filename] = loadtable(filename)
+        return t